@@ -4,15 +4,53 @@ Real-time monitoring dashboard for Twilio RIVA Voice Agent
 """
 from aiohttp import web
 import aiohttp
-import json
+import orjson
 import asyncio
 import psutil
-import datetime
+import hashlib
 import os
+import re
+import time
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 load_dotenv()
 
+# psutil.cpu_percent(interval=None) reports usage since the previous call, so
+# prime it once here and sample at most once per SAMPLE_INTERVAL seconds.
+SAMPLE_INTERVAL = 1.0
+_last_sample_time = 0.0
+_last_sample = {"cpu": 0.0, "memory": 0.0}
+psutil.cpu_percent(interval=None)
+
+# Boot time is fixed for the life of the process
+BOOT_TIME = psutil.boot_time()
+
+# CPU and memory enter the status ETag in METRIC_ETAG_STEP-point buckets and
+# uptime by the hour, so sampling jitter doesn't defeat 304s on an idle system;
+# the body still carries the exact values
+METRIC_ETAG_STEP = 5
+
+LOG_FILE = '/home/ubuntu/twilio_riva_agent/logs/voice_agent.log'
+LOG_TAIL_BYTES = 4096
+
+# Command-line patterns formerly passed to `pgrep -f`, combined into one
+# alternation so each process command line is scanned once
+SERVICE_NAMES = {
+    "voice_agent": "Voice Agent",
+    "twiml_server": "TwiML Server",
+    "ngrok": "Ngrok Tunnels",
+}
+SERVICE_PATTERN = re.compile(
+    r"(?P<voice_agent>python3.*main.py)"
+    r"|(?P<twiml_server>python3.*twiml_server.py)"
+    r"|(?P<ngrok>ngrok)"
+)
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
@@ -83,14 +121,36 @@ HTML_TEMPLATE = """
         .refresh-btn:hover { background: #059669; }
     </style>
     <script>
+        const BASE_INTERVAL = 5000;
+        const MAX_INTERVAL = 30000;
+        let lastEtag = null;
+        let pollInterval = BASE_INTERVAL;
+        let pollTimer = null;
+        
         function refreshData() {
-            fetch('/api/status')
-                .then(response => response.json())
-                .then(data => {
-                    document.getElementById('status-content').innerHTML = renderStatus(data);
+            const headers = lastEtag ? {'If-None-Match': lastEtag} : {};
+            return fetch('/api/status', {cache: 'no-cache', headers: headers})
+                .then(response => {
+                    if (response.status === 304) {
+                        // Nothing changed; poll less often
+                        pollInterval = Math.min(pollInterval * 2, MAX_INTERVAL);
+                        return;
+                    }
+                    lastEtag = response.headers.get('ETag');
+                    pollInterval = BASE_INTERVAL;
+                    return response.json().then(data => {
+                        document.getElementById('status-content').innerHTML = renderStatus(data);
+                    });
                 });
         }
         
+        function schedulePoll() {
+            clearTimeout(pollTimer);
+            // Jitter keeps several open dashboards from polling in lockstep
+            const delay = pollInterval * (0.8 + Math.random() * 0.4);
+            pollTimer = setTimeout(() => refreshData().catch(() => {}).finally(schedulePoll), delay);
+        }
+        
         function renderStatus(data) {
             let html = '';
             
@@ -129,11 +189,8 @@ HTML_TEMPLATE = """
             return html;
         }
         
-        // Auto-refresh every 5 seconds
-        setInterval(refreshData, 5000);
-        
-        // Initial load
-        window.onload = refreshData;
+        // Initial load, then auto-refresh with conditional requests
+        window.onload = () => refreshData().catch(() => {}).finally(schedulePoll);
     </script>
 </head>
 <body>
@@ -148,8 +205,46 @@ HTML_TEMPLATE = """
 </html>
 """
 
-async def get_system_status():
-    """Get system and service status"""
+# The page is static, so encode it and compute its validator once
+HTML_BODY = HTML_TEMPLATE.encode('utf-8')
+HTML_ETAG = f'"{hashlib.md5(HTML_BODY).hexdigest()}"'
+HTML_HEADERS = {'ETag': HTML_ETAG, 'Cache-Control': 'public, max-age=3600'}
+
+def sample_system_metrics():
+    """Return CPU and memory usage, refreshed at most once per SAMPLE_INTERVAL"""
+    global _last_sample_time
+    now = time.monotonic()
+    if now - _last_sample_time >= SAMPLE_INTERVAL:
+        _last_sample["cpu"] = psutil.cpu_percent(interval=None)
+        _last_sample["memory"] = psutil.virtual_memory().percent
+        _last_sample_time = now
+    return _last_sample
+
+def scan_services():
+    """Check which services are running with a single pass over the process table"""
+    found = set()
+    # process_iter(attrs) reads each process through oneshot(), batching /proc reads
+    for proc in psutil.process_iter(['name', 'cmdline']):
+        cmdline = ' '.join(proc.info['cmdline'] or []) or (proc.info['name'] or '')
+        for match in SERVICE_PATTERN.finditer(cmdline):
+            found.add(match.lastgroup)
+        if len(found) == len(SERVICE_NAMES):
+            break
+    return {name: key in found for key, name in SERVICE_NAMES.items()}
+
+def tail_log(path, num_lines):
+    """Return the last num_lines of a log file, reading only its final block"""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - LOG_TAIL_BYTES))
+        lines = f.read().splitlines()
+    # Drop the first line when the seek landed mid-line
+    if size > LOG_TAIL_BYTES and lines:
+        lines = lines[1:]
+    return [line.decode('utf-8', 'replace').strip() for line in lines[-num_lines:]]
+
+def collect_status():
+    """Collect system and service status (blocking; run in an executor)"""
     status = {
         "services": {},
         "system": {},
@@ -158,30 +253,16 @@ async def get_system_status():
     }
     
     # Check services
-    import subprocess
-    
-    # Voice Agent
-    result = subprocess.run(['pgrep', '-f', 'python3.*main.py'], capture_output=True)
-    status["services"]["Voice Agent"] = result.returncode == 0
-    
-    # TwiML Server
-    result = subprocess.run(['pgrep', '-f', 'python3.*twiml_server.py'], capture_output=True)
-    status["services"]["TwiML Server"] = result.returncode == 0
-    
-    # Ngrok
-    result = subprocess.run(['pgrep', '-f', 'ngrok'], capture_output=True)
-    status["services"]["Ngrok Tunnels"] = result.returncode == 0
+    status["services"] = scan_services()
     
     # System metrics
-    status["system"]["cpu"] = psutil.cpu_percent(interval=1)
-    status["system"]["memory"] = psutil.virtual_memory().percent
+    metrics = sample_system_metrics()
+    status["system"]["cpu"] = metrics["cpu"]
+    status["system"]["memory"] = metrics["memory"]
     
     # Calculate uptime
-    boot_time = datetime.datetime.fromtimestamp(psutil.boot_time())
-    uptime = datetime.datetime.now() - boot_time
-    hours = int(uptime.total_seconds() // 3600)
-    minutes = int((uptime.total_seconds() % 3600) // 60)
-    status["system"]["uptime"] = f"{hours}h {minutes}m"
+    hours, remainder = divmod(int(time.time() - BOOT_TIME), 3600)
+    status["system"]["uptime"] = f"{hours}h {remainder // 60}m"
     
     # URLs
     status["urls"]["websocket"] = os.getenv("WEBSOCKET_URL", "Not configured")
@@ -189,22 +270,45 @@ async def get_system_status():
     
     # Recent logs (last 5 lines)
     try:
-        with open('/home/ubuntu/twilio_riva_agent/logs/voice_agent.log', 'r') as f:
-            lines = f.readlines()
-            status["recent_logs"] = [line.strip() for line in lines[-5:]]
+        status["recent_logs"] = tail_log(LOG_FILE, 5)
     except:
         status["recent_logs"] = ["No logs available"]
     
     return status
 
+async def get_system_status():
+    """Get system and service status without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, collect_status)
+
 async def handle_index(request):
     """Serve the dashboard HTML"""
-    return web.Response(text=HTML_TEMPLATE, content_type='text/html')
+    if request.headers.get('If-None-Match') == HTML_ETAG:
+        return web.Response(status=304, headers=HTML_HEADERS)
+    return web.Response(body=HTML_BODY, content_type='text/html', charset='utf-8', headers=HTML_HEADERS)
+
+def status_etag(status):
+    """Validator over the status fields, with the noisy metrics bucketed"""
+    system = status["system"]
+    key = orjson.dumps([
+        status["services"],
+        status["urls"],
+        status["recent_logs"],
+        int(system["cpu"] // METRIC_ETAG_STEP),
+        int(system["memory"] // METRIC_ETAG_STEP),
+        int(time.time() - BOOT_TIME) // 3600,
+    ])
+    return f'"{hashlib.blake2s(key, digest_size=8).hexdigest()}"'
 
 async def handle_api_status(request):
     """API endpoint for status data"""
     status = await get_system_status()
-    return web.json_response(status)
+    etag = status_etag(status)
+    if request.headers.get('If-None-Match') == etag:
+        return web.Response(status=304, headers={'ETag': etag})
+    # A bytes body has a known length, so aiohttp writes headers and body together
+    body = orjson.dumps(status)
+    return web.Response(body=body, content_type='application/json', headers={'ETag': etag})
 
 async def create_app():
     app = web.Application()
@@ -213,6 +317,8 @@ async def create_app():
     return app
 
 if __name__ == '__main__':
+    if uvloop is not None:
+        uvloop.install()
     app = create_app()
     print("Starting dashboard on http://localhost:3000")
     print("Access remotely at: https://dashboard.ngrok.app (configure in ngrok)")
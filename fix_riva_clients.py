@@ -1,51 +1,52 @@
 #!/usr/bin/env python3
 """Fix RIVA client initialization for new API"""
 
-import fileinput
-import sys
+import os
+import re
+
+NEW_AUTH = (
+    "            # Use the new RIVA client API\n"
+    "            self.auth = riva.client.Auth(uri=self.server)\n"
+)
+
+ASR_REPLACEMENTS = [
+    # Replace with proper Auth initialization
+    (re.compile(r"^.*self\.auth = None  # No auth needed for local RIVA.*\n?", re.M), NEW_AUTH),
+    # Fix ASRService initialization (now only takes auth)
+    (re.compile(r"^.*self\.asr_service = riva\.client\.ASRService\(self\.auth, self\.server\).*\n?", re.M),
+     "            self.asr_service = riva.client.ASRService(self.auth)\n"),
+]
+
+TTS_REPLACEMENTS = [
+    # Replace with proper Auth initialization
+    (re.compile(r"^.*self\.auth = None  # or None if no auth.*\n?", re.M), NEW_AUTH),
+    # Fix SpeechSynthesisService initialization (now only takes auth)
+    (re.compile(r"^.*self\.tts = riva\.client\.SpeechSynthesisService\(self\.auth, self\.server\).*\n?", re.M),
+     "            self.tts = riva.client.SpeechSynthesisService(self.auth)\n"),
+]
+
+def rewrite_file(file_path, replacements):
+    """Apply regex replacements to a file and swap the result in atomically"""
+    with open(file_path, 'r') as f:
+        data = f.read()
+
+    for pattern, replacement in replacements:
+        data = pattern.sub(replacement, data)
+
+    # Write to a sibling temp file so a crash never leaves a truncated source
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
 
 def fix_asr_client():
     file_path = "/home/ubuntu/twilio_riva_agent/services/riva_asr_client.py"
-    
-    # Read the file
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    # Fix the initialization
-    with open(file_path, 'w') as f:
-        for i, line in enumerate(lines):
-            if "self.auth = None  # No auth needed for local RIVA" in line:
-                # Replace with proper Auth initialization
-                f.write("            # Use the new RIVA client API\n")
-                f.write("            self.auth = riva.client.Auth(uri=self.server)\n")
-            elif "self.asr_service = riva.client.ASRService(self.auth, self.server)" in line:
-                # Fix ASRService initialization (now only takes auth)
-                f.write("            self.asr_service = riva.client.ASRService(self.auth)\n")
-            else:
-                f.write(line)
-    
+    rewrite_file(file_path, ASR_REPLACEMENTS)
     print("Fixed riva_asr_client.py")
 
 def fix_tts_client():
     file_path = "/home/ubuntu/twilio_riva_agent/services/riva_tts_client.py"
-    
-    # Read the file
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    # Fix the initialization
-    with open(file_path, 'w') as f:
-        for i, line in enumerate(lines):
-            if "self.auth = None  # or None if no auth" in line:
-                # Replace with proper Auth initialization
-                f.write("            # Use the new RIVA client API\n")
-                f.write("            self.auth = riva.client.Auth(uri=self.server)\n")
-            elif "self.tts = riva.client.SpeechSynthesisService(self.auth, self.server)" in line:
-                # Fix SpeechSynthesisService initialization (now only takes auth)
-                f.write("            self.tts = riva.client.SpeechSynthesisService(self.auth)\n")
-            else:
-                f.write(line)
-    
+    rewrite_file(file_path, TTS_REPLACEMENTS)
     print("Fixed riva_tts_client.py")
 
 if __name__ == "__main__":
@@ -6,29 +6,152 @@ Tests system performance under various load conditions
 
 import asyncio
 import aiohttp
-import json
+import orjson
 import time
-import random
-import statistics
-from typing import List, Dict, Any
+import numpy as np
+from typing import Dict, Any, Optional
 from datetime import datetime
 import argparse
 import logging
+import logging.handlers
+import queue
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def start_log_listener() -> logging.handlers.QueueListener:
+    """Hand this module's log records to a background thread for writing
+    
+    logger.info() then only enqueues the record, keeping blocking stderr
+    writes off the event loop while calls are in flight.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.propagate = False
+    listener.start()
+    return listener
+
+# Jitter bounds (seconds) for each simulated interaction, one column per
+# stage: ASR audio duration, LLM thinking, TTS generation, pause before next turn
+INTERACTION_DELAY_LOW = np.array([2.0, 0.5, 0.3, 8.0])
+INTERACTION_DELAY_HIGH = np.array([5.0, 2.0, 1.0, 12.0])
+
+class CallResults:
+    """Structure-of-arrays store for simulated call results
+    
+    Per-call scalars live in preallocated NumPy columns and every call's
+    interaction latencies share one flat array indexed by lat_offsets, so
+    long endurance runs don't accumulate millions of Python floats.
+    """
+    
+    def __init__(self, capacity: int = 1024, latency_capacity: int = 8192):
+        self.count = 0
+        self.start_time = np.empty(capacity, dtype=np.float64)
+        self.duration = np.empty(capacity, dtype=np.float64)
+        self.success = np.zeros(capacity, dtype=np.bool_)
+        self.lat_offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.latencies = np.empty(latency_capacity, dtype=np.float64)
+        self.call_ids = []
+        self.errors = []
+        
+    def __len__(self) -> int:
+        return self.count
+        
+    @staticmethod
+    def _grow(arr: np.ndarray, needed: int) -> np.ndarray:
+        """Return arr, or a copy with at least `needed` slots"""
+        if needed <= len(arr):
+            return arr
+        grown = np.zeros(max(needed, 2 * len(arr)), dtype=arr.dtype)
+        grown[:len(arr)] = arr
+        return grown
+        
+    def append(self, result: Dict[str, Any]):
+        """Commit one simulate_call result dict into the columns"""
+        i = self.count
+        lat_start = self.lat_offsets[i]
+        lat_end = lat_start + len(result['latencies'])
+        
+        self.start_time = self._grow(self.start_time, i + 1)
+        self.duration = self._grow(self.duration, i + 1)
+        self.success = self._grow(self.success, i + 1)
+        self.lat_offsets = self._grow(self.lat_offsets, i + 2)
+        self.latencies = self._grow(self.latencies, lat_end)
+        
+        self.start_time[i] = result['start_time']
+        self.duration[i] = result['duration']
+        self.success[i] = result['success']
+        self.latencies[lat_start:lat_end] = result['latencies']
+        self.lat_offsets[i + 1] = lat_end
+        self.call_ids.append(result['call_id'])
+        self.errors.append(result['errors'])
+        self.count = i + 1
+        
+    def extend(self, results):
+        for result in results:
+            self.append(result)
+            
+    def successful_latencies(self) -> np.ndarray:
+        """Latencies of every interaction belonging to a successful call"""
+        n = self.count
+        per_call = np.diff(self.lat_offsets[:n + 1])
+        mask = np.repeat(self.success[:n], per_call)
+        return self.latencies[:self.lat_offsets[n]][mask]
+        
+    def __iter__(self):
+        """Yield results back in their original dict form"""
+        for i in range(self.count):
+            lat_start, lat_end = self.lat_offsets[i], self.lat_offsets[i + 1]
+            yield {
+                'call_id': self.call_ids[i],
+                'start_time': float(self.start_time[i]),
+                'duration': float(self.duration[i]),
+                'latencies': self.latencies[lat_start:lat_end].tolist(),
+                'errors': self.errors[i],
+                'success': bool(self.success[i])
+            }
+
 class LoadTester:
     """Load testing for the voice agent system"""
     
-    def __init__(self, base_url: str, twilio_phone: str):
+    def __init__(self, base_url: str, twilio_phone: str, max_inflight: int = 100):
         self.base_url = base_url
         self.twilio_phone = twilio_phone
-        self.results = []
+        self.max_inflight = max_inflight
+        self.results = CallResults()
         self.errors = []
+        self._session = None
+        # Bound concurrent HTTP requests so the tester doesn't exhaust its own sockets
+        self._sem = asyncio.Semaphore(max_inflight)
+        
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        """Create the shared HTTP session on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_inflight, ttl_dns_cache=300, keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
         
-    async def simulate_call(self, call_id: str, duration: int = 60):
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        
+    async def simulate_call(self, call_id: str, duration: int = 60, start_delay: float = 0.0):
         """Simulate a single call"""
+        if start_delay:
+            await asyncio.sleep(start_delay)
+            
         start_time = time.time()
         result = {
             'call_id': call_id,
@@ -40,48 +163,47 @@ class LoadTester:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                # Simulate call initiation
-                async with session.post(
-                    f"{self.base_url}/test/initiate_call",
-                    json={
-                        'call_id': call_id,
-                        'from': f"+1234567890{call_id[-4:]}",
-                        'to': self.twilio_phone
-                    }
-                ) as resp:
-                    if resp.status != 200:
-                        result['errors'].append(f"Failed to initiate call: {resp.status}")
-                        return result
+            session = await self._ensure_session()
+            
+            # Simulate call initiation
+            async with self._sem, session.post(
+                f"{self.base_url}/test/initiate_call",
+                json={
+                    'call_id': call_id,
+                    'from': f"+1234567890{call_id[-4:]}",
+                    'to': self.twilio_phone
+                }
+            ) as resp:
+                if resp.status != 200:
+                    result['errors'].append(f"Failed to initiate call: {resp.status}")
+                    return result
+            
+            # Simulate conversation interactions
+            interactions = int(duration // 10)  # One interaction every 10 seconds
+            # Draw every delay for this call at once from a per-call generator
+            delays = np.random.default_rng().uniform(
+                INTERACTION_DELAY_LOW, INTERACTION_DELAY_HIGH, size=(interactions, 4)
+            ).tolist()
+            for audio_duration, llm_time, tts_time, pause in delays:
+                interaction_start = time.time()
                 
-                # Simulate conversation interactions
-                interactions = duration // 10  # One interaction every 10 seconds
-                for i in range(interactions):
-                    interaction_start = time.time()
-                    
-                    # Simulate ASR
-                    await self._simulate_asr(session, call_id)
-                    
-                    # Simulate LLM processing
-                    await self._simulate_llm(session, call_id)
-                    
-                    # Simulate TTS
-                    await self._simulate_tts(session, call_id)
-                    
-                    interaction_latency = (time.time() - interaction_start) * 1000
-                    result['latencies'].append(interaction_latency)
-                    
-                    # Wait before next interaction
-                    await asyncio.sleep(random.uniform(8, 12))
+                # Simulate ASR, LLM and TTS back to back with a single timer
+                await asyncio.sleep(audio_duration * 0.1 + llm_time + tts_time)
                 
-                # Simulate call completion
-                async with session.post(
-                    f"{self.base_url}/test/complete_call",
-                    json={'call_id': call_id}
-                ) as resp:
-                    if resp.status == 200:
-                        result['success'] = True
-                        
+                interaction_latency = (time.time() - interaction_start) * 1000
+                result['latencies'].append(interaction_latency)
+                
+                # Wait before next interaction
+                await asyncio.sleep(pause)
+            
+            # Simulate call completion
+            async with self._sem, session.post(
+                f"{self.base_url}/test/complete_call",
+                json={'call_id': call_id}
+            ) as resp:
+                if resp.status == 200:
+                    result['success'] = True
+                    
         except Exception as e:
             result['errors'].append(str(e))
             logger.error(f"Error in call {call_id}: {e}")
@@ -89,34 +211,45 @@ class LoadTester:
         result['duration'] = time.time() - start_time
         return result
         
-    async def _simulate_asr(self, session: aiohttp.ClientSession, call_id: str):
-        """Simulate ASR processing"""
-        # Generate random audio duration (simulating speech)
-        audio_duration = random.uniform(2, 5)
+    # The per-stage helpers below are not used by simulate_call, which sleeps
+    # once for all three stages; they keep their original signatures.
+    
+    async def _simulate_asr(self, session: aiohttp.ClientSession, call_id: str, audio_duration: Optional[float] = None):
+        """Simulate ASR processing (unused by simulate_call)"""
+        if audio_duration is None:
+            # Generate random audio duration (simulating speech)
+            audio_duration = np.random.uniform(2, 5)
         await asyncio.sleep(audio_duration * 0.1)  # Simulate processing time
         
-    async def _simulate_llm(self, session: aiohttp.ClientSession, call_id: str):
-        """Simulate LLM processing"""
+    async def _simulate_llm(self, session: aiohttp.ClientSession, call_id: str, llm_time: Optional[float] = None):
+        """Simulate LLM processing (unused by simulate_call)"""
         # Simulate LLM thinking time
-        await asyncio.sleep(random.uniform(0.5, 2))
+        if llm_time is None:
+            llm_time = np.random.uniform(0.5, 2)
+        await asyncio.sleep(llm_time)
         
-    async def _simulate_tts(self, session: aiohttp.ClientSession, call_id: str):
-        """Simulate TTS processing"""
+    async def _simulate_tts(self, session: aiohttp.ClientSession, call_id: str, tts_time: Optional[float] = None):
+        """Simulate TTS processing (unused by simulate_call)"""
         # Simulate TTS generation time
-        await asyncio.sleep(random.uniform(0.3, 1))
+        if tts_time is None:
+            tts_time = np.random.uniform(0.3, 1)
+        await asyncio.sleep(tts_time)
         
     async def run_concurrent_calls(self, num_calls: int, duration: int = 60):
         """Run multiple concurrent calls"""
         logger.info(f"Starting {num_calls} concurrent calls for {duration} seconds each")
         
+        # Stagger call starts slightly; every task is scheduled up front and
+        # waits out its own independent offset, so all calls overlap within
+        # the first half second instead of ramping in at ~0.3 s per call
+        start_delays = np.random.uniform(0.1, 0.5, size=num_calls)
+        batch_time = int(time.time())
+        
         tasks = []
         for i in range(num_calls):
-            call_id = f"test_{int(time.time())}_{i:04d}"
-            task = asyncio.create_task(self.simulate_call(call_id, duration))
+            call_id = f"test_{batch_time}_{i:04d}"
+            task = asyncio.create_task(self.simulate_call(call_id, duration, float(start_delays[i])))
             tasks.append(task)
-            
-            # Stagger call starts slightly
-            await asyncio.sleep(random.uniform(0.1, 0.5))
         
         # Wait for all calls to complete
         results = await asyncio.gather(*tasks)
@@ -184,63 +317,55 @@ class LoadTester:
         if not self.results:
             return {"error": "No results to analyze"}
             
-        successful_calls = [r for r in self.results if r['success']]
-        failed_calls = [r for r in self.results if not r['success']]
+        results = self.results
+        success = results.success[:results.count]
+        successful_count = int(success.sum())
+        failed_count = results.count - successful_count
         
-        all_latencies = []
-        for result in successful_calls:
-            all_latencies.extend(result['latencies'])
+        all_latencies = results.successful_latencies()
             
         analysis = {
             'summary': {
-                'total_calls': len(self.results),
-                'successful_calls': len(successful_calls),
-                'failed_calls': len(failed_calls),
-                'success_rate': len(successful_calls) / len(self.results) if self.results else 0
+                'total_calls': results.count,
+                'successful_calls': successful_count,
+                'failed_calls': failed_count,
+                'success_rate': successful_count / results.count
             }
         }
         
-        if all_latencies:
+        if all_latencies.size:
+            # One selection pass yields every quantile; the median is p50
+            p50, p95, p99 = np.percentile(all_latencies, [50, 95, 99])
             analysis['latency'] = {
-                'mean': statistics.mean(all_latencies),
-                'median': statistics.median(all_latencies),
-                'stdev': statistics.stdev(all_latencies) if len(all_latencies) > 1 else 0,
-                'min': min(all_latencies),
-                'max': max(all_latencies),
-                'p50': self._percentile(all_latencies, 50),
-                'p95': self._percentile(all_latencies, 95),
-                'p99': self._percentile(all_latencies, 99)
+                'mean': float(all_latencies.mean()),
+                'median': float(p50),
+                'stdev': float(all_latencies.std(ddof=1)) if all_latencies.size > 1 else 0,
+                'min': float(all_latencies.min()),
+                'max': float(all_latencies.max()),
+                'p50': float(p50),
+                'p95': float(p95),
+                'p99': float(p99)
             }
             
-        if successful_calls:
-            durations = [r['duration'] for r in successful_calls]
+        if successful_count:
+            durations = results.duration[:results.count][success]
             analysis['call_duration'] = {
-                'mean': statistics.mean(durations),
-                'median': statistics.median(durations),
-                'min': min(durations),
-                'max': max(durations)
+                'mean': float(durations.mean()),
+                'median': float(np.median(durations)),
+                'min': float(durations.min()),
+                'max': float(durations.max())
             }
             
-        if failed_calls:
+        if failed_count:
             error_types = {}
-            for call in failed_calls:
-                for error in call['errors']:
+            for i in np.flatnonzero(~success):
+                for error in results.errors[i]:
                     error_type = error.split(':')[0] if ':' in error else error
                     error_types[error_type] = error_types.get(error_type, 0) + 1
             analysis['errors'] = error_types
             
         return analysis
         
-    def _percentile(self, data: List[float], percentile: int) -> float:
-        """Calculate percentile"""
-        sorted_data = sorted(data)
-        index = (len(sorted_data) - 1) * percentile / 100
-        lower = int(index)
-        upper = lower + 1
-        if upper >= len(sorted_data):
-            return sorted_data[lower]
-        return sorted_data[lower] + (sorted_data[upper] - sorted_data[lower]) * (index - lower)
-        
     def print_report(self):
         """Print test report"""
         analysis = self.analyze_results()
@@ -291,14 +416,17 @@ class LoadTester:
             filename = f"load_test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             
         analysis = self.analyze_results()
-        data = {
-            'timestamp': datetime.now().isoformat(),
-            'analysis': analysis,
-            'raw_results': self.results
-        }
         
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Write raw results one record at a time rather than serializing the
+        # whole result set into a single buffer
+        with open(filename, 'wb') as f:
+            f.write(b'{"timestamp": ' + orjson.dumps(datetime.now().isoformat()))
+            f.write(b',\n"analysis": ' + orjson.dumps(analysis, option=orjson.OPT_INDENT_2))
+            f.write(b',\n"raw_results": [')
+            for i, result in enumerate(self.results):
+                f.write(b',\n' if i else b'\n')
+                f.write(orjson.dumps(result))
+            f.write(b'\n]}\n')
             
         logger.info(f"Results saved to {filename}")
 
@@ -311,6 +439,7 @@ async def main():
                        default='concurrent', help='Type of load test')
     parser.add_argument('--calls', type=int, default=10, help='Number of concurrent calls')
     parser.add_argument('--duration', type=int, default=60, help='Duration of each call in seconds')
+    parser.add_argument('--max-inflight', type=int, default=100, help='Maximum concurrent HTTP requests')
     parser.add_argument('--output', help='Output file for results')
     
     args = parser.parse_args()
@@ -320,7 +449,7 @@ async def main():
         # Use monitoring server endpoint for testing
         args.base_url = 'http://localhost:9090'
     
-    tester = LoadTester(args.base_url, args.twilio_phone)
+    tester = LoadTester(args.base_url, args.twilio_phone, args.max_inflight)
     
     try:
         if args.test_type == 'concurrent':
@@ -343,6 +472,14 @@ async def main():
     except KeyboardInterrupt:
         logger.info("Test interrupted by user")
         tester.print_report()
+    finally:
+        await tester.close()
         
 if __name__ == "__main__":
-    asyncio.run(main())
+    log_listener = start_log_listener()
+    try:
+        if uvloop is not None:
+            uvloop.install()
+        asyncio.run(main())
+    finally:
+        log_listener.stop()
@@ -4,23 +4,40 @@ Main application controller for Twilio RIVA Voice Agent
 """
 import asyncio
 import websockets
-import json
-import base64
+import orjson
 import logging
-import audioop
 import sys
 import os
-from typing import Dict, Optional
-from collections import defaultdict
+import time
+import weakref
+import numpy as np
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
 from dotenv import load_dotenv
 
+try:
+    # SIMD-accelerated codec; same API as the stdlib for the calls used here
+    from pybase64 import b64decode, b64encode_as_string
+except ImportError:
+    from base64 import b64decode, b64encode
+
+    def b64encode_as_string(data: bytes) -> str:
+        return b64encode(data).decode('ascii')
+
+try:
+    import uvloop
+except ImportError:  # uvloop is Linux/macOS only; Windows keeps the default loop
+    uvloop = None
+
 # Add services directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'services'))
 
-from websocket_server import TwilioMediaStreamHandler
+from websocket_server import TwilioMediaStreamHandler, SERVER_OPTIONS
 from riva_asr_client import RivaASRClient, AudioProcessor  
 from openai_client import OpenAIClient, ResponseBuffer
-from riva_tts_client import RivaTTSClient, AudioOutputManager, AudioChunker
+from riva_tts_client import RivaTTSClient, AudioOutputManager, AudioChunker, SILENCE_ULAW_CHUNK
+import mulaw
 
 load_dotenv()
 
@@ -30,43 +47,135 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Outbound audio is sent in bursts that Twilio buffers for playback; the sender
+# sleeps once per burst (~FRAMES_PER_BATCH frames) instead of per 20 ms frame
+FRAME_DURATION_NS = 20_000_000
+FRAMES_PER_BATCH = 5
+
+# Barge-in detection: RMS threshold and how often (in frames) to evaluate it
+VAD_RMS_THRESHOLD = 500
+VAD_FRAME_STRIDE = 3
+
+# Bursts at least this large are encoded in a worker thread; below it the
+# thread hop costs more than the base64 work it would move off the loop
+OFFLOAD_MIN_FRAMES = 50
+
+# Twilio always serializes media events as {"event":"media",...} with the
+# payload as a plain base64 string, which lets the hot path skip JSON parsing
+MEDIA_EVENT_MARKER = '"event":"media"'
+PAYLOAD_MARKER = '"payload":"'
+
+# Outbound frames buffered ahead of the sender task (32 frames = 640 ms)
+SEND_QUEUE_SIZE = 32
+
+GREETING = "Hello! I'm your AI assistant. How can I help you today?"
+
+# Silent frames are common and identical, so their payload is encoded once
+SILENCE_PAYLOAD = b64encode_as_string(SILENCE_ULAW_CHUNK)
+
+def encode_payload(chunk: bytes) -> str:
+    """Base64 payload for a μ-law chunk"""
+    if chunk == SILENCE_ULAW_CHUNK:
+        return SILENCE_PAYLOAD
+    return b64encode_as_string(chunk)
+
+def encode_frames(chunks: list, media_prefix: str, media_suffix: str) -> list:
+    """Wrap μ-law chunks in Twilio media messages"""
+    # An f-string builds the frame in one allocation; chained + makes a
+    # throwaway intermediate string per frame
+    return [f"{media_prefix}{encode_payload(chunk)}{media_suffix}" for chunk in chunks]
+
+def drain_queue(queue: asyncio.Queue):
+    """Discard everything waiting in a queue"""
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        queue.task_done()
+
+@dataclass(slots=True)
+class ConnectionState:
+    """Per-connection resources and call metadata"""
+    audio_processor: AudioProcessor
+    output_manager: AudioOutputManager
+    audio_chunker: AudioChunker
+    response_buffer: ResponseBuffer
+    # Weak so a lingering task can't keep a closed socket and its buffers alive
+    websocket_ref: Optional[weakref.ref] = None
+    stream_sid: Optional[str] = None
+    call_sid: Optional[str] = None
+    caller_number: Optional[str] = None
+    # Set by the stream start event; audio is only sent back once started
+    start_time: Optional[float] = None
+    # streamSid is fixed for the stream, so only the payload varies
+    # between outbound media messages
+    media_prefix: str = ""
+    media_suffix: str = ""
+    # Inbound media frames seen, used to subsample voice activity detection
+    frame_counter: int = 0
+    # Conversation state
+    is_speaking: bool = False
+    last_transcript: str = ""
+    # Ready-to-send media frames, drained by sender_task; None stops it
+    send_queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=SEND_QUEUE_SIZE))
+    sender_task: Optional[asyncio.Task] = None
+    # Background tasks (ASR, greeting) cancelled when the connection closes
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+    
+    @property
+    def started(self) -> bool:
+        return self.start_time is not None
+    
+    @property
+    def websocket(self) -> Any:
+        return self.websocket_ref() if self.websocket_ref is not None else None
+    
+    def spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine tied to this connection's lifetime"""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
 class VoiceAgent:
     """Main voice agent orchestrator"""
     
     def __init__(self):
-        self.connections: Dict[str, dict] = {}
-        self.audio_buffers = defaultdict(bytearray)
-        self.stream_sids = {}
-        self.call_sids = {}
-        self.caller_numbers = {}
+        # All per-connection state, keyed by connection id
+        self.states: Dict[int, ConnectionState] = {}
         
         # Initialize services
         self.asr_client = RivaASRClient()
         self.openai_client = OpenAIClient()
         self.tts_client = RivaTTSClient()
         
-        # Audio processors per connection
-        self.audio_processors = {}
-        self.output_managers = {}
-        self.audio_chunkers = {}
-        self.response_buffers = {}
+        # Limits concurrent TTS production so bursts of callers can't starve
+        # the event loop that paces every call's audio
+        self.send_sem = asyncio.Semaphore(int(os.getenv('TTS_CONCURRENCY', (os.cpu_count() or 1) * 2)))
         
-        # Track conversation state
-        self.is_speaking = defaultdict(bool)
-        self.last_transcript = defaultdict(str)
+        # The greeting never changes, so it is synthesized and encoded once
+        self._greeting_payloads: Optional[list] = None
+        self._greeting_lock = asyncio.Lock()
         
         logger.info("Voice Agent initialized")
     
+    def create_state(self) -> ConnectionState:
+        """Create the per-connection audio pipeline"""
+        return ConnectionState(
+            audio_processor=AudioProcessor(self.asr_client),
+            output_manager=AudioOutputManager(self.tts_client),
+            audio_chunker=AudioChunker(),
+            response_buffer=ResponseBuffer()
+        )
+    
     async def handle_connection(self, websocket, path=None):
         """Handle new WebSocket connection from Twilio"""
         connection_id = id(websocket)
         logger.info(f"New WebSocket connection: {connection_id}")
         
         # Initialize per-connection resources
-        self.audio_processors[connection_id] = AudioProcessor(self.asr_client)
-        self.output_managers[connection_id] = AudioOutputManager(self.tts_client)
-        self.audio_chunkers[connection_id] = AudioChunker()
-        self.response_buffers[connection_id] = ResponseBuffer()
+        self.states[connection_id] = self.create_state()
         
         try:
             async for message in websocket:
@@ -84,29 +193,29 @@ class VoiceAgent:
         logger.info(f"Processing message for connection {connection_id}")
         """Process incoming message from Twilio"""
         try:
-            data = json.loads(message)
+            # Nearly every frame is a media event; slice its payload out
+            # directly and only fully parse the rare control events
+            if isinstance(message, str) and MEDIA_EVENT_MARKER in message[:64]:
+                start = message.find(PAYLOAD_MARKER)
+                if start != -1:
+                    start += len(PAYLOAD_MARKER)
+                    end = message.find('"', start)
+                    if end != -1:
+                        await self.handle_media_payload(message[start:end], connection_id)
+                        return
+            
+            data = orjson.loads(message)
             event = data.get('event')
             logger.info(f"Event received: {event}")
             
             if event == 'start':
                 await self.handle_start(data, connection_id, websocket)
             elif event == 'media':
-                # Auto-initialize if no start event was received
-                if connection_id not in self.audio_processors:
-                    logger.info(f"Auto-initializing for connection {connection_id}")
-                    self.audio_processors[connection_id] = AudioProcessor(self.asr_client)
-                    self.output_managers[connection_id] = AudioOutputManager(self.tts_client)
-                    self.audio_chunkers[connection_id] = AudioChunker()
-                    self.response_buffers[connection_id] = ResponseBuffer()
-                    self.caller_numbers[connection_id] = "Unknown"
-                    self.stream_sids[connection_id] = "auto"
-                    self.call_sids[connection_id] = "auto"
-                    asyncio.create_task(self.start_asr_processing(connection_id))
                 await self.handle_media(data, connection_id, websocket)
             elif event == 'stop':
                 await self.handle_stop(data, connection_id)
                 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Invalid JSON received: {message[:100]}")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
@@ -121,52 +230,78 @@ class VoiceAgent:
         # Extract caller information
         caller_number = custom_params.get('from', 'Unknown')
         
-        self.stream_sids[connection_id] = stream_sid
-        self.call_sids[connection_id] = call_sid
-        self.caller_numbers[connection_id] = caller_number
+        state = self.states.get(connection_id)
+        if state is None:
+            state = self.states[connection_id] = self.create_state()
         
-        self.connections[connection_id] = {
-            'stream_sid': stream_sid,
-            'call_sid': call_sid,
-            'caller_number': caller_number,
-            'websocket': websocket,
-            'start_time': asyncio.get_event_loop().time()
-        }
+        state.stream_sid = stream_sid
+        state.call_sid = call_sid
+        state.caller_number = caller_number
+        state.websocket_ref = weakref.ref(websocket)
+        state.start_time = asyncio.get_running_loop().time()
+        state.media_prefix = f'{{"event":"media","streamSid":{orjson.dumps(stream_sid).decode()},"media":{{"payload":"'
+        state.media_suffix = '"}}'
+        if state.sender_task is None:
+            state.sender_task = asyncio.create_task(self.sender_loop(state))
         
         logger.info(f"Stream started - SID: {stream_sid}, Call: {call_sid}, From: {caller_number}")
         
         # Start ASR processing for this connection
-        asyncio.create_task(self.start_asr_processing(connection_id))
+        state.spawn(self.start_asr_processing(connection_id))
         
         # Send initial greeting
-        asyncio.create_task(self.send_greeting(connection_id))
+        state.spawn(self.send_greeting(connection_id))
     
     async def handle_media(self, data: dict, connection_id: int, websocket):
         logger.info(f"handle_media called for connection {connection_id}")
         """Handle incoming audio media"""
         media = data.get('media', {})
         payload = media.get('payload')
+        if payload:
+            await self.handle_media_payload(payload, connection_id)
+    
+    async def handle_media_payload(self, payload: str, connection_id: int):
+        """Handle the base64 μ-law payload of a media event"""
+        state = self.states.get(connection_id)
+        if state is None:
+            # Auto-initialize if no start event was received
+            logger.info(f"Auto-initializing for connection {connection_id}")
+            state = self.create_state()
+            state.caller_number = "Unknown"
+            state.stream_sid = "auto"
+            state.call_sid = "auto"
+            self.states[connection_id] = state
+            state.spawn(self.start_asr_processing(connection_id))
         
-        if payload and connection_id in self.audio_processors:
+        if payload:
+            add_audio = state.audio_processor.add_audio
+            
             # Decode the base64 μ-law audio
-            audio_bytes = base64.b64decode(payload)
+            audio_bytes = b64decode(payload)
             
             # Convert μ-law to PCM
-            pcm_audio = audioop.ulaw2lin(audio_bytes, 2)
+            pcm = mulaw.decode(audio_bytes)
+            pcm_audio = pcm.tobytes()
             
-            # Check if we're currently speaking - if so, check for interruption
-            if self.is_speaking[connection_id]:
+            # Check if we're currently speaking - if so, check for interruption.
+            # Speech onset spans several 20 ms frames, so every Nth frame is enough.
+            state.frame_counter += 1
+            if (state.is_speaking and pcm.size
+                    and state.frame_counter % VAD_FRAME_STRIDE == 0):
                 # Simple voice activity detection
                 # If significant audio detected, interrupt TTS
-                audio_level = audioop.rms(pcm_audio, 2)
-                if audio_level > 500:  # Threshold for voice detection
+                samples = pcm.astype(np.int64)  # 160 squared int16s overflow int32
+                energy = int(np.dot(samples, samples))
+                if energy > VAD_RMS_THRESHOLD * VAD_RMS_THRESHOLD * pcm.size:  # RMS above threshold
                     logger.info(f"Voice detected during TTS, interrupting for connection {connection_id}")
-                    self.output_managers[connection_id].interrupt()
-                    self.is_speaking[connection_id] = False
+                    state.output_manager.interrupt()
+                    state.is_speaking = False
+                    # Unblock the producer and stop queued audio going out
+                    drain_queue(state.send_queue)
             
             # Add to ASR processor
             logger.debug(f"Feeding {len(pcm_audio)} bytes to ASR")
-            await self.audio_processors[connection_id].add_audio(pcm_audio)
+            await add_audio(pcm_audio)
     
     async def handle_stop(self, data: dict, connection_id: int):
         """Handle stream stop event"""
@@ -175,7 +310,8 @@ class VoiceAgent:
     
     async def start_asr_processing(self, connection_id: int):
         """Start ASR processing for a connection"""
-        if connection_id not in self.audio_processors:
+        state = self.states.get(connection_id)
+        if state is None:
             return
         
         async def handle_transcript(result):
@@ -184,147 +320,233 @@ class VoiceAgent:
             is_final = result['is_final']
             
             if is_final and transcript.strip():
-                logger.info(f"Final transcript from {self.caller_numbers.get(connection_id)}: {transcript}")
+                logger.info(f"Final transcript from {state.caller_number}: {transcript}")
                 
                 # Store last transcript
-                self.last_transcript[connection_id] = transcript
+                state.last_transcript = transcript
                 
                 # Process with OpenAI
                 await self.process_with_ai(connection_id, transcript)
         
         # Start processing
-        await self.audio_processors[connection_id].start_processing(handle_transcript)
+        await state.audio_processor.start_processing(handle_transcript)
     
     async def process_with_ai(self, connection_id: int, transcript: str):
         """Process transcript with OpenAI and generate response"""
-        if connection_id not in self.connections:
+        state = self.states.get(connection_id)
+        if state is None or not state.started:
             return
         
-        caller_id = self.caller_numbers.get(connection_id, "unknown")
-        response_buffer = self.response_buffers[connection_id]
+        caller_id = state.caller_number or "unknown"
+        response_buffer = state.response_buffer
         response_buffer.clear()
         
-        try:
-            # Get AI response
-            full_response = ""
-            async for chunk in self.openai_client.process_transcript(transcript, caller_id):
-                full_response += chunk
-                response_buffer.add_chunk(chunk)
-                
-                # Check for complete sentences to start TTS early
-                complete_sentences = response_buffer.get_complete_sentences()
-                for sentence in complete_sentences:
-                    await self.synthesize_and_send(connection_id, sentence)
-            
-            # Send any remaining text
-            remaining = response_buffer.get_remaining()
-            if remaining.strip():
-                await self.synthesize_and_send(connection_id, remaining)
+        # The LLM stream is read by a separate task so generation keeps going
+        # while earlier sentences are synthesized and played; None ends it
+        sentences = asyncio.Queue()
+        
+        async def read_response():
+            try:
+                # Get AI response
+                async for chunk in self.openai_client.process_transcript(transcript, caller_id):
+                    response_buffer.add_chunk(chunk)
+                    
+                    # Queue complete sentences to start TTS early
+                    for sentence in response_buffer.get_complete_sentences():
+                        sentences.put_nowait(sentence)
                 
-        except Exception as e:
-            logger.error(f"Error processing with AI: {e}")
-            await self.synthesize_and_send(connection_id, "I apologize, but I'm having trouble processing that.")
+                # Send any remaining text
+                remaining = response_buffer.get_remaining()
+                if remaining.strip():
+                    sentences.put_nowait(remaining)
+                    
+            except Exception as e:
+                logger.error(f"Error processing with AI: {e}")
+                sentences.put_nowait("I apologize, but I'm having trouble processing that.")
+            finally:
+                sentences.put_nowait(None)
+        
+        reader = state.spawn(read_response())
+        try:
+            while (sentence := await sentences.get()) is not None:
+                await self.synthesize_and_send(connection_id, sentence)
+        finally:
+            reader.cancel()
     
     async def synthesize_and_send(self, connection_id: int, text: str):
         """Synthesize text and send audio to Twilio"""
-        if connection_id not in self.connections:
+        state = self.states.get(connection_id)
+        if state is None or not state.started:
             return
         
-        websocket = self.connections[connection_id]['websocket']
-        stream_sid = self.stream_sids[connection_id]
-        output_manager = self.output_managers[connection_id]
-        chunker = self.audio_chunkers[connection_id]
+        # Bind everything the per-chunk loop touches to locals up front
+        put = state.send_queue.put
+        encode = encode_payload
+        to_thread = asyncio.to_thread
+        media_prefix = state.media_prefix
+        media_suffix = state.media_suffix
+        output_manager = state.output_manager
+        add_audio = state.audio_chunker.add_audio
         
         try:
-            self.is_speaking[connection_id] = True
+            state.is_speaking = True
             
-            # Synthesize and send audio
-            async for audio_chunk in output_manager.synthesize_and_queue(text):
-                if not self.is_speaking[connection_id]:
-                    # Interrupted
-                    break
+            # Bound how many utterances synthesize and encode at once; frames
+            # are collected locally so the permit is released before queuing
+            # them, since put() blocks at playback pace once the queue is full
+            frames = []
+            append = frames.append
+            async with self.send_sem:
+                # aclosing() finalizes the generator on break so TTS stops right away
+                async with aclosing(output_manager.synthesize_and_queue(text)) as audio_stream:
+                    async for audio_chunk in audio_stream:
+                        # Check before chunking so no interrupted audio is encoded
+                        if not state.is_speaking:
+                            break
+                        
+                        # Chunk audio for smooth streaming
+                        chunks = add_audio(audio_chunk)
+                        
+                        if len(chunks) >= OFFLOAD_MIN_FRAMES:
+                            # Keep large encodes off the event loop serving other calls
+                            frames.extend(await to_thread(encode_frames, chunks, media_prefix, media_suffix))
+                        else:
+                            for chunk in chunks:
+                                # Base64 encode for Twilio and wrap in the media message
+                                append(f"{media_prefix}{encode(chunk)}{media_suffix}")
                 
-                # Chunk audio for smooth streaming
-                chunks = chunker.add_audio(audio_chunk)
-                
-                for chunk in chunks:
-                    # Base64 encode for Twilio
-                    encoded_audio = base64.b64encode(chunk).decode('utf-8')
-                    
-                    # Create media message
-                    message = {
-                        "event": "media",
-                        "streamSid": stream_sid,
-                        "media": {
-                            "payload": encoded_audio
-                        }
-                    }
-                    
-                    await websocket.send(json.dumps(message))
-                    
-                    # Small delay for smooth playback
-                    await asyncio.sleep(0.02)  # 20ms chunks
+                if state.is_speaking:
+                    # Send any remaining audio
+                    remaining = state.audio_chunker.get_remaining()
+                    if remaining:
+                        append(f"{media_prefix}{encode(remaining)}{media_suffix}")
+            
+            # Queue the utterance; the sender task paces it out
+            for frame in frames:
+                if not state.is_speaking:
+                    break
+                await put(frame)
             
-            # Send any remaining audio
-            remaining = chunker.get_remaining()
-            if remaining:
-                encoded_audio = base64.b64encode(remaining).decode('utf-8')
-                message = {
-                    "event": "media",
-                    "streamSid": stream_sid,
-                    "media": {
-                        "payload": encoded_audio
-                    }
-                }
-                await websocket.send(json.dumps(message))
+            await self.finish_speaking(state, connection_id)
                 
         except Exception as e:
             logger.error(f"Error in TTS synthesis and sending: {e}")
         finally:
-            self.is_speaking[connection_id] = False
+            state.is_speaking = False
+    
+    async def finish_speaking(self, state: ConnectionState, connection_id: int):
+        """Wait for queued audio to play out, or clear it if interrupted"""
+        if state.is_speaking:
+            # Stay "speaking" until the sender has flushed the utterance so
+            # barge-in detection covers audio that is still going out
+            await state.send_queue.join()
+        if self.states.get(connection_id) is not state:
+            # Connection was cleaned up; leave its stop sentinel in the queue
+            return
+        websocket = state.websocket
+        if websocket is None:
+            return
+        if not state.is_speaking:
+            # Interrupted; discard pending audio and drop what Twilio buffered
+            state.audio_chunker.reset()
+            drain_queue(state.send_queue)
+            await websocket.send(orjson.dumps({"event": "clear", "streamSid": state.stream_sid}).decode())
+    
+    async def sender_loop(self, state: ConnectionState):
+        """Send queued frames to Twilio at playback rate"""
+        queue = state.send_queue
+        sleep = asyncio.sleep
+        monotonic_ns = time.monotonic_ns
+        frames_since_sleep = 0
+        # When the audio sent so far finishes playing; sleeping to a deadline
+        # keeps send time from accumulating as drift
+        play_until = 0
+        
+        while True:
+            frame = await queue.get()
+            try:
+                if frame is None:
+                    break
+                # Resolved per frame so the loop never pins the socket
+                websocket = state.websocket
+                if websocket is not None:
+                    await websocket.send(frame)
+            except Exception as e:
+                logger.error(f"Error sending audio frame: {e}")
+            finally:
+                queue.task_done()
+            
+            # Pace by the playback time of the burst just sent
+            play_until = max(play_until, monotonic_ns()) + FRAME_DURATION_NS
+            frames_since_sleep += 1
+            if frames_since_sleep >= FRAMES_PER_BATCH:
+                delay = play_until - monotonic_ns()
+                if delay > 0:
+                    await sleep(delay / 1_000_000_000)
+                frames_since_sleep = 0
+    
+    async def get_greeting_payloads(self) -> list:
+        """Synthesize the greeting on first use and cache its base64 payloads"""
+        async with self._greeting_lock:
+            if self._greeting_payloads is None:
+                output_manager = AudioOutputManager(self.tts_client)
+                chunker = AudioChunker()
+                chunks = []
+                async for audio_chunk in output_manager.synthesize_and_queue(GREETING):
+                    chunks.extend(chunker.add_audio(audio_chunk))
+                remaining = chunker.get_remaining()
+                if remaining:
+                    chunks.append(remaining)
+                self._greeting_payloads = [encode_payload(chunk) for chunk in chunks]
+                logger.info(f"Cached greeting audio ({len(chunks)} frames)")
+        return self._greeting_payloads
     
     async def send_greeting(self, connection_id: int):
         """Send initial greeting to caller"""
-        await asyncio.sleep(0.5)  # Small delay for connection establishment
+        payloads = await self.get_greeting_payloads()
         
-        caller = self.caller_numbers.get(connection_id, "")
-        greeting = "Hello! I'm your AI assistant. How can I help you today?"
+        state = self.states.get(connection_id)
+        if state is None or not state.started:
+            return
+        
+        put = state.send_queue.put
+        media_prefix = state.media_prefix
+        media_suffix = state.media_suffix
         
-        await self.synthesize_and_send(connection_id, greeting)
+        try:
+            state.is_speaking = True
+            
+            for payload in payloads:
+                if not state.is_speaking:
+                    break
+                await put(f"{media_prefix}{payload}{media_suffix}")
+            
+            await self.finish_speaking(state, connection_id)
+                
+        except Exception as e:
+            logger.error(f"Error sending greeting: {e}")
+        finally:
+            state.is_speaking = False
     
     async def cleanup_connection(self, connection_id: int):
         """Clean up connection resources"""
-        # Stop audio processing
-        if connection_id in self.audio_processors:
-            self.audio_processors[connection_id].stop_processing()
-            del self.audio_processors[connection_id]
-        
-        # Clear conversation history
-        caller_id = self.caller_numbers.get(connection_id)
-        if caller_id:
-            self.openai_client.clear_caller_history(caller_id)
-        
-        # Clean up other resources
-        if connection_id in self.connections:
-            del self.connections[connection_id]
-        if connection_id in self.audio_buffers:
-            del self.audio_buffers[connection_id]
-        if connection_id in self.stream_sids:
-            del self.stream_sids[connection_id]
-        if connection_id in self.call_sids:
-            del self.call_sids[connection_id]
-        if connection_id in self.caller_numbers:
-            del self.caller_numbers[connection_id]
-        if connection_id in self.output_managers:
-            del self.output_managers[connection_id]
-        if connection_id in self.audio_chunkers:
-            del self.audio_chunkers[connection_id]
-        if connection_id in self.response_buffers:
-            del self.response_buffers[connection_id]
-        if connection_id in self.is_speaking:
-            del self.is_speaking[connection_id]
-        if connection_id in self.last_transcript:
-            del self.last_transcript[connection_id]
+        state = self.states.pop(connection_id, None)
+        if state is not None:
+            # Stop audio processing; producers still running see the flag and stop
+            state.audio_processor.stop_processing()
+            state.is_speaking = False
+            
+            # Stop the sender; draining first guarantees room for the sentinel
+            drain_queue(state.send_queue)
+            state.send_queue.put_nowait(None)
+            
+            # Cancel ASR and greeting tasks still holding this connection
+            for task in list(state.tasks):
+                task.cancel()
+            
+            # Clear conversation history
+            if state.caller_number:
+                self.openai_client.clear_caller_history(state.caller_number)
         
         logger.info(f"Cleaned up resources for connection {connection_id}")
 
@@ -338,9 +560,13 @@ async def main():
         host = os.getenv('WEBSOCKET_HOST', '0.0.0.0')
         port = int(os.getenv('WEBSOCKET_PORT', 8080))
         
+        # Set when several worker processes share the port; the kernel then
+        # spreads incoming calls across them
+        reuse_port = os.getenv('WEBSOCKET_REUSE_PORT') == '1'
+        
         logger.info(f"Starting Voice Agent WebSocket server on {host}:{port}")
         
-        async with websockets.serve(agent.handle_connection, host, port):
+        async with websockets.serve(agent.handle_connection, host, port, reuse_port=reuse_port, **SERVER_OPTIONS):
             logger.info("Voice Agent is running...")
             logger.info("Waiting for incoming calls...")
             await asyncio.Future()  # Run forever
@@ -352,4 +578,6 @@ async def main():
         raise
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main())
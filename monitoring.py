@@ -5,25 +5,103 @@ Provides real-time monitoring, metrics collection, and alerting
 """
 
 import asyncio
-import json
+import hashlib
 import time
+from array import array
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from collections import defaultdict, deque
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Callable
+from collections import defaultdict, deque, namedtuple
 import aiohttp
 from aiohttp import web
+import orjson
 import psutil
-from performance_optimizer import PerformanceOptimizer
+from performance_optimizer import PerformanceOptimizer, EXPORT_BOUNDS
 
 logger = logging.getLogger(__name__)
 
+# HELP/TYPE lines for the fixed metric families never change between scrapes
+CALLS_HEADER = (
+    b"# HELP voice_agent_calls_total Total number of calls\n"
+    b"# TYPE voice_agent_calls_total counter"
+)
+SUCCESS_RATE_HEADER = (
+    b"# HELP voice_agent_success_rate Call success rate\n"
+    b"# TYPE voice_agent_success_rate gauge"
+)
+CPU_USAGE_HEADER = (
+    b"# HELP system_cpu_usage_percent System CPU usage\n"
+    b"# TYPE system_cpu_usage_percent gauge"
+)
+MEMORY_USAGE_HEADER = (
+    b"# HELP system_memory_usage_percent System memory usage\n"
+    b"# TYPE system_memory_usage_percent gauge"
+)
+
+# Only the most recent events of each call are kept
+MAX_CALL_EVENTS = 256
+
+# Scrapes are small and frequent; the body is sent uncompressed so neither
+# aiohttp nor a proxy re-gzips an unchanged payload each time
+METRICS_HEADERS = {
+    'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+    'Content-Encoding': 'identity',
+    'Cache-Control': 'no-cache'
+}
+
+def latency_template(component: str) -> bytes:
+    """Exposition block for one latency histogram, with the sample values left as placeholders"""
+    # Escape % in the component name so only the value placeholders format
+    component = component.replace('%', '%%')
+    name = f"voice_agent_latency_{component}_ms"
+    lines = [f"# HELP {name} Latency for {component}", f"# TYPE {name} histogram"]
+    lines.extend(f'{name}_bucket{{le="{bound}"}} %d' for bound in EXPORT_BOUNDS)
+    lines.append(f'{name}_bucket{{le="+Inf"}} %d')
+    lines.append(f'{name}_sum %r')
+    lines.append(f'{name}_count %d')
+    return '\n'.join(lines).encode()
+
+def json_default(obj: Any) -> Any:
+    """Encode the types orjson has no native support for"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, deque)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(data: Any) -> bytes:
+    """Serialize with the options shared by every monitoring endpoint"""
+    return orjson.dumps(data, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+def json_response(data: Any, status: int = 200) -> web.Response:
+    """JSON response serialized with orjson instead of the stdlib encoder"""
+    return web.Response(body=dumps(data), status=status, content_type='application/json')
+
+def json_handler(produce: Callable) -> Callable:
+    """Turn a coroutine returning plain data into an aiohttp handler"""
+    async def handler(request):
+        return json_response(await produce(request))
+    return handler
+
 class MonitoringServer:
     """HTTP server for monitoring endpoints and metrics"""
     
-    def __init__(self, performance_optimizer: PerformanceOptimizer, port: int = 9090):
+    def __init__(self, performance_optimizer: PerformanceOptimizer, port: int = 9090,
+                 metrics_ttl: float = 10.0):
         self.performance_optimizer = performance_optimizer
         self.port = port
+        # Rendered /metrics body, refreshed by MetricsCollector or once it is
+        # older than metrics_ttl seconds
+        self.metrics_ttl = metrics_ttl
+        self._metrics_body = b''
+        self._metrics_rendered_at = float('-inf')
+        # Per-component latency exposition templates, built on first sight
+        self._latency_templates: Dict[str, bytes] = {}
+        # Cached /health as (body, status, etag), refreshed on the same schedule
+        self._health = None
+        self._health_rendered_at = float('-inf')
         self.app = web.Application()
         self.runner = None
         self.call_registry = CallRegistry()
@@ -34,15 +112,16 @@ class MonitoringServer:
         """Setup HTTP routes for monitoring"""
         self.app.router.add_get('/health', self.health_check)
         self.app.router.add_get('/metrics', self.get_metrics)
-        self.app.router.add_get('/stats', self.get_stats)
+        self.app.router.add_get('/stats', json_handler(self.get_stats))
         self.app.router.add_get('/calls', self.get_calls)
-        self.app.router.add_get('/alerts', self.get_alerts)
-        self.app.router.add_get('/performance', self.get_performance)
-        self.app.router.add_get('/resources', self.get_resources)
+        self.app.router.add_get('/alerts', json_handler(self.get_alerts))
+        self.app.router.add_get('/performance', json_handler(self.get_performance))
+        self.app.router.add_get('/resources', json_handler(self.get_resources))
         
     async def start(self):
         """Start the monitoring server"""
-        self.runner = web.AppRunner(self.app)
+        # Keep idle scraper connections open across scrape intervals up to 2 min
+        self.runner = web.AppRunner(self.app, keepalive_timeout=120)
         await self.runner.setup()
         site = web.TCPSite(self.runner, '0.0.0.0', self.port)
         await site.start()
@@ -57,31 +136,49 @@ class MonitoringServer:
     async def health_check(self, request):
         """Health check endpoint"""
         try:
-            health_status = {
-                'status': 'healthy',
-                'timestamp': datetime.now().isoformat(),
-                'uptime_seconds': self.performance_optimizer.metrics.get_stats()['uptime_seconds'],
-                'components': self.check_components()
-            }
+            if self._health is None or time.monotonic() - self._health_rendered_at >= self.metrics_ttl:
+                self.refresh_health()
+            body, status_code, etag = self._health
             
-            # Determine overall health
-            if all(comp['status'] == 'healthy' for comp in health_status['components'].values()):
-                health_status['status'] = 'healthy'
-                status_code = 200
-            elif any(comp['status'] == 'critical' for comp in health_status['components'].values()):
-                health_status['status'] = 'critical'
-                status_code = 503
-            else:
-                health_status['status'] = 'degraded'
-                status_code = 200
-                
-            return web.json_response(health_status, status=status_code)
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers={'ETag': etag})
+            return web.Response(body=body, status=status_code, content_type='application/json',
+                                headers={'ETag': etag})
             
         except Exception as e:
             logger.error(f"Health check error: {e}")
-            return web.json_response({'status': 'error', 'error': str(e)}, status=500)
+            return json_response({'status': 'error', 'error': str(e)}, status=500)
             
-    def check_components(self) -> Dict[str, Any]:
+    def refresh_health(self, performance_stats: Optional[Dict[str, Any]] = None,
+                       resource_stats: Optional[Dict[str, Any]] = None):
+        """Rebuild the cached /health body, reusing already collected stats if given"""
+        if performance_stats is None:
+            performance_stats = self.performance_optimizer.metrics.get_stats()
+        health_status = {
+            'status': 'healthy',
+            'timestamp': datetime.now(),
+            'uptime_seconds': performance_stats['uptime_seconds'],
+            'components': self.check_components(resource_stats)
+        }
+        
+        # Determine overall health from one pass over the component statuses
+        statuses = [comp['status'] for comp in health_status['components'].values()]
+        if 'critical' in statuses:
+            health_status['status'] = 'critical'
+            status_code = 503
+        elif statuses.count('healthy') == len(statuses):
+            health_status['status'] = 'healthy'
+            status_code = 200
+        else:
+            health_status['status'] = 'degraded'
+            status_code = 200
+            
+        body = dumps(health_status)
+        etag = f'"{hashlib.blake2s(body, digest_size=8).hexdigest()}"'
+        self._health = (body, status_code, etag)
+        self._health_rendered_at = time.monotonic()
+            
+    def check_components(self, resources: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Check health of individual components"""
         components = {}
         
@@ -104,7 +201,8 @@ class MonitoringServer:
         }
         
         # Check system resources
-        resources = self.performance_optimizer.resource_monitor.get_stats()
+        if resources is None:
+            resources = self.performance_optimizer.resource_monitor.get_stats()
         if resources and resources.get('system'):
             system_stats = resources['system']
             if system_stats.get('cpu_percent', 0) > 90:
@@ -132,45 +230,50 @@ class MonitoringServer:
         
     async def get_metrics(self, request):
         """Get Prometheus-compatible metrics"""
+        if time.monotonic() - self._metrics_rendered_at >= self.metrics_ttl:
+            self.refresh_metrics()
+        return web.Response(body=self._metrics_body, headers=METRICS_HEADERS)
+        
+    def refresh_metrics(self):
+        """Re-render the cached Prometheus exposition body"""
+        self._metrics_body = self.render_metrics()
+        self._metrics_rendered_at = time.monotonic()
+        
+    def render_metrics(self) -> bytes:
+        """Render Prometheus metrics from the current stats"""
+        # %r renders numbers exactly as str() would, straight into bytes
         metrics_lines = []
         
         # Get performance stats
         stats = self.performance_optimizer.metrics.get_stats()
         
         # Call metrics
-        metrics_lines.append(f"# HELP voice_agent_calls_total Total number of calls")
-        metrics_lines.append(f"# TYPE voice_agent_calls_total counter")
-        metrics_lines.append(f'voice_agent_calls_total{{status="success"}} {stats["successful_calls"]}')
-        metrics_lines.append(f'voice_agent_calls_total{{status="failed"}} {stats["failed_calls"]}')
+        metrics_lines.append(CALLS_HEADER)
+        metrics_lines.append(b'voice_agent_calls_total{status="success"} %r' % stats["successful_calls"])
+        metrics_lines.append(b'voice_agent_calls_total{status="failed"} %r' % stats["failed_calls"])
         
         # Success rate
-        metrics_lines.append(f"# HELP voice_agent_success_rate Call success rate")
-        metrics_lines.append(f"# TYPE voice_agent_success_rate gauge")
-        metrics_lines.append(f'voice_agent_success_rate {stats["success_rate"]}')
-        
-        # Latency metrics
-        for component, latencies in stats.get('latencies', {}).items():
-            metrics_lines.append(f"# HELP voice_agent_latency_{component}_ms Latency for {component}")
-            metrics_lines.append(f"# TYPE voice_agent_latency_{component}_ms summary")
-            metrics_lines.append(f'voice_agent_latency_{component}_ms{{quantile="0.5"}} {latencies.get("p50", 0)}')
-            metrics_lines.append(f'voice_agent_latency_{component}_ms{{quantile="0.95"}} {latencies.get("p95", 0)}')
-            metrics_lines.append(f'voice_agent_latency_{component}_ms{{quantile="0.99"}} {latencies.get("p99", 0)}')
-            metrics_lines.append(f'voice_agent_latency_{component}_ms_sum {latencies.get("avg", 0) * stats["total_calls"]}')
-            metrics_lines.append(f'voice_agent_latency_{component}_ms_count {stats["total_calls"]}')
+        metrics_lines.append(SUCCESS_RATE_HEADER)
+        metrics_lines.append(b'voice_agent_success_rate %r' % stats["success_rate"])
+        
+        # Latency metrics, as native histograms so scrapers can aggregate them
+        for component, (buckets, total, count) in self.performance_optimizer.metrics.get_histograms().items():
+            template = self._latency_templates.get(component)
+            if template is None:
+                template = self._latency_templates[component] = latency_template(component)
+            metrics_lines.append(template % (*buckets, count, total, count))
         
         # Resource metrics
         resources = self.performance_optimizer.resource_monitor.get_stats()
         if resources and resources.get('system'):
             system_stats = resources['system']
-            metrics_lines.append(f"# HELP system_cpu_usage_percent System CPU usage")
-            metrics_lines.append(f"# TYPE system_cpu_usage_percent gauge")
-            metrics_lines.append(f'system_cpu_usage_percent {system_stats.get("cpu_percent", 0)}')
+            metrics_lines.append(CPU_USAGE_HEADER)
+            metrics_lines.append(b'system_cpu_usage_percent %r' % system_stats.get("cpu_percent", 0))
             
-            metrics_lines.append(f"# HELP system_memory_usage_percent System memory usage")
-            metrics_lines.append(f"# TYPE system_memory_usage_percent gauge")
-            metrics_lines.append(f'system_memory_usage_percent {system_stats.get("memory_percent", 0)}')
+            metrics_lines.append(MEMORY_USAGE_HEADER)
+            metrics_lines.append(b'system_memory_usage_percent %r' % system_stats.get("memory_percent", 0))
             
-        return web.Response(text='\n'.join(metrics_lines), content_type='text/plain')
+        return b'\n'.join(metrics_lines)
         
     async def get_stats(self, request):
         """Get detailed statistics"""
@@ -180,200 +283,346 @@ class MonitoringServer:
             'calls': self.call_registry.get_stats(),
             'alerts': self.alert_manager.get_active_alerts()
         }
-        return web.json_response(stats)
+        return stats
         
     async def get_calls(self, request):
-        """Get active and recent calls"""
-        return web.json_response(self.call_registry.get_calls())
+        """Get active and recent calls, streamed one record at a time
+        
+        ?offset=M&limit=N page the completed history (oldest first).
+        """
+        try:
+            offset = int(request.query.get('offset', 0))
+            limit = int(request.query['limit']) if 'limit' in request.query else None
+        except ValueError:
+            return json_response({'error': 'offset and limit must be integers'}, status=400)
+        if offset < 0 or (limit is not None and limit < 0):
+            return json_response({'error': 'offset and limit must not be negative'}, status=400)
+            
+        registry = self.call_registry
+        # Take the rows up front so calls starting or ending while the
+        # response is written cannot change what is being iterated
+        active = registry.get_active_calls()
+        completed = registry.get_completed_calls(offset, limit)
+        stats = registry.get_call_stats()
+        
+        response = web.StreamResponse(headers={'Content-Type': 'application/json'})
+        await response.prepare(request)
+        await response.write(b'{"active":[')
+        await self._write_rows(response, active)
+        await response.write(b'],"completed":[')
+        await self._write_rows(response, completed)
+        await response.write(b'],"stats":' + dumps(stats) + b'}')
+        await response.write_eof()
+        return response
+        
+    async def _write_rows(self, response: web.StreamResponse, rows: List[Dict[str, Any]]):
+        """Write rows as comma separated JSON objects"""
+        separator = b''
+        for row in rows:
+            await response.write(separator + dumps(row))
+            separator = b','
         
     async def get_alerts(self, request):
         """Get active alerts"""
-        return web.json_response(self.alert_manager.get_active_alerts())
+        return self.alert_manager.get_active_alerts()
         
     async def get_performance(self, request):
         """Get performance metrics"""
-        return web.json_response(self.performance_optimizer.metrics.get_stats())
+        return self.performance_optimizer.metrics.get_stats()
         
     async def get_resources(self, request):
         """Get resource usage"""
-        return web.json_response(self.performance_optimizer.resource_monitor.get_stats())
+        return self.performance_optimizer.resource_monitor.get_stats()
+
+def public_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop internal bookkeeping keys (leading underscore) before serializing"""
+    return {key: value for key, value in record.items() if not key.startswith('_')}
 
 class CallRegistry:
     """Registry for tracking active and recent calls"""
     
     def __init__(self, history_size: int = 100):
         self.active_calls = {}
-        self.completed_calls = deque(maxlen=history_size)
-        self.call_stats = defaultdict(int)
+        
+        # Call counters
+        self.total_calls = 0
+        self.completed_calls_count = 0
+        self.failed_calls_count = 0
+        self.total_duration = 0.0
+        # Any other completion status is rare; count those by name
+        self.other_status_counts = defaultdict(int)
+        
+        # Completed call history as a fixed-size ring of parallel columns;
+        # rows are only assembled into dicts when /calls is requested
+        self.history_size = history_size
+        self._call_ids = [None] * history_size
+        self._phone_numbers = [None] * history_size
+        self._start_times = [None] * history_size
+        self._end_times = [None] * history_size
+        self._statuses = [None] * history_size
+        self._events = [None] * history_size
+        self._durations = array('d', bytes(8 * history_size))
+        self._head = 0  # next slot to overwrite
+        self._history_count = 0
         
     def register_call(self, call_id: str, phone_number: str):
         """Register a new call"""
+        # Timestamps stay datetime objects; orjson renders them on output.
+        # Durations come from the monotonic clock, so nothing is re-parsed.
+        start_time = datetime.now()
         self.active_calls[call_id] = {
             'call_id': call_id,
             'phone_number': phone_number,
-            'start_time': datetime.now().isoformat(),
+            'start_time': start_time,
             'duration': 0,
             'status': 'active',
-            'events': []
+            'events': deque(maxlen=MAX_CALL_EVENTS),
+            '_start_monotonic': time.monotonic(),
+            '_start_epoch': start_time.timestamp()
         }
-        self.call_stats['total_calls'] += 1
-        
-    def update_call(self, call_id: str, event: str, data: Any = None):
-        """Update call with an event"""
-        if call_id in self.active_calls:
-            call = self.active_calls[call_id]
-            call['events'].append({
-                'timestamp': datetime.now().isoformat(),
-                'event': event,
-                'data': data
-            })
+        self.total_calls += 1
+        
+    def update_call(self, call_id: str, event: str, data: Any = None, now: Optional[float] = None):
+        """Update call with an event
+        
+        now is a time.monotonic() reading; callers recording a batch of
+        events can take it once and pass it to every update.
+        """
+        call = self.active_calls.get(call_id)
+        if call is not None:
+            if now is None:
+                now = time.monotonic()
+            elapsed = now - call['_start_monotonic']
+            # Events are (epoch, event, data) tuples derived from the same
+            # clock reading and only turned into dicts when read
+            call['events'].append((call['_start_epoch'] + elapsed, event, data))
             
             # Update duration
-            start_time = datetime.fromisoformat(call['start_time'])
-            call['duration'] = (datetime.now() - start_time).total_seconds()
+            call['duration'] = elapsed
             
     def complete_call(self, call_id: str, status: str = 'completed'):
         """Mark a call as completed"""
         if call_id in self.active_calls:
             call = self.active_calls.pop(call_id)
-            call['status'] = status
-            call['end_time'] = datetime.now().isoformat()
             
             # Calculate final duration
-            start_time = datetime.fromisoformat(call['start_time'])
-            call['duration'] = (datetime.now() - start_time).total_seconds()
+            duration = time.monotonic() - call['_start_monotonic']
             
-            self.completed_calls.append(call)
+            slot = self._head
+            self._call_ids[slot] = call_id
+            self._phone_numbers[slot] = call['phone_number']
+            self._start_times[slot] = call['start_time']
+            self._end_times[slot] = datetime.now()
+            self._statuses[slot] = status
+            self._events[slot] = call['events']
+            self._durations[slot] = duration
+            self._head = (slot + 1) % self.history_size
+            if self._history_count < self.history_size:
+                self._history_count += 1
             
             # Update stats
-            self.call_stats[f'{status}_calls'] += 1
-            self.call_stats['total_duration'] += call['duration']
+            if status == 'completed':
+                self.completed_calls_count += 1
+            elif status == 'failed':
+                self.failed_calls_count += 1
+            else:
+                self.other_status_counts[f'{status}_calls'] += 1
+            self.total_duration += duration
+            
+    def _history_slots(self) -> range:
+        """Ring slots of completed calls, oldest first"""
+        if self._history_count < self.history_size:
+            return range(self._history_count)
+        return range(self._head, self._head + self.history_size)
+        
+    def get_active_calls(self) -> List[Dict[str, Any]]:
+        """Active call records without internal bookkeeping fields"""
+        return [
+            {**public_fields(call), 'events': render_events(call['events'])}
+            for call in self.active_calls.values()
+        ]
+        
+    def get_completed_calls(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Build completed call records from the history columns"""
+        size = self.history_size
+        slots = self._history_slots()
+        slots = slots[offset:] if limit is None else slots[offset:offset + limit]
+        records = []
+        for i in slots:
+            slot = i % size
+            records.append({
+                'call_id': self._call_ids[slot],
+                'phone_number': self._phone_numbers[slot],
+                'start_time': self._start_times[slot],
+                'duration': self._durations[slot],
+                'status': self._statuses[slot],
+                'events': render_events(self._events[slot]),
+                'end_time': self._end_times[slot]
+            })
+        return records
             
     def get_calls(self) -> Dict[str, Any]:
         """Get active and recent calls"""
         return {
-            'active': list(self.active_calls.values()),
-            'completed': list(self.completed_calls),
-            'stats': dict(self.call_stats)
+            'active': self.get_active_calls(),
+            'completed': self.get_completed_calls(),
+            'stats': self.get_call_stats()
+        }
+        
+    def get_call_stats(self) -> Dict[str, Any]:
+        """Lifetime call counters"""
+        return {
+            'total_calls': self.total_calls,
+            'completed_calls': self.completed_calls_count,
+            'failed_calls': self.failed_calls_count,
+            'total_duration': self.total_duration,
+            **self.other_status_counts
         }
         
     def get_stats(self) -> Dict[str, Any]:
         """Get call statistics"""
         active_count = len(self.active_calls)
-        completed_count = len(self.completed_calls)
+        completed_count = self._history_count
         
         stats = {
             'active_calls': active_count,
             'completed_calls_in_history': completed_count,
-            'total_calls': self.call_stats['total_calls'],
+            'total_calls': self.total_calls,
             'average_duration': 0
         }
         
-        if self.call_stats['completed_calls'] > 0:
-            stats['average_duration'] = self.call_stats['total_duration'] / self.call_stats['completed_calls']
+        # Mean over the history window, reduced straight from the duration column
+        if completed_count > 0:
+            stats['average_duration'] = sum(self._durations[:completed_count]) / completed_count
             
         return stats
 
+def render_events(events: deque) -> List[Dict[str, Any]]:
+    """Expand stored (epoch, event, data) tuples into event records"""
+    return [
+        {'timestamp': datetime.fromtimestamp(timestamp), 'event': event, 'data': data}
+        for timestamp, event, data in events
+    ]
+
+def iter_bits(mask: int):
+    """Yield the indexes of the set bits in mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+# Scalars the alert rules are evaluated against
+AlertSnapshot = namedtuple('AlertSnapshot', 'cpu mem max_p95 success_rate total_calls')
+
+@dataclass(frozen=True)
+class AlertRule:
+    """Alert rule: fires while condition, an expression over AlertSnapshot fields, is true"""
+    name: str
+    severity: str
+    message: str
+    condition: str
+
+def compile_alert_rules(rules: List[AlertRule]) -> Callable[..., int]:
+    """Generate one function that evaluates every rule and returns the firing bitmask"""
+    lines = [f"def evaluate({', '.join(AlertSnapshot._fields)}):", "    mask = 0"]
+    for index, rule in enumerate(rules):
+        lines.append(f"    if {rule.condition}: mask |= {1 << index}  # {rule.name}")
+    lines.append("    return mask")
+    namespace = {}
+    exec(compile('\n'.join(lines), '<alert rules>', 'exec'), namespace)
+    return namespace['evaluate']
+
 class AlertManager:
     """Manage system alerts and notifications"""
     
     def __init__(self):
-        self.alerts = {}
         self.alert_history = deque(maxlen=1000)
         self.alert_rules = self.setup_alert_rules()
-        
-    def setup_alert_rules(self) -> List[Dict[str, Any]]:
+        # All rules run as one generated function instead of a call per rule
+        self._evaluate_rules = compile_alert_rules(self.alert_rules)
+        # Alerts are addressed by rule index; bit i of the mask is set while
+        # rule i is firing and _alerts[i] holds its record
+        self._alerts: List[Optional[Dict[str, Any]]] = [None] * len(self.alert_rules)
+        self._active_mask = 0
+        
+    def setup_alert_rules(self) -> List[AlertRule]:
         """Setup alert rules"""
         return [
-            {
-                'name': 'high_cpu_usage',
-                'condition': lambda stats: stats.get('system', {}).get('cpu_percent', 0) > 80,
-                'severity': 'warning',
-                'message': 'CPU usage is above 80%'
-            },
-            {
-                'name': 'critical_cpu_usage',
-                'condition': lambda stats: stats.get('system', {}).get('cpu_percent', 0) > 95,
-                'severity': 'critical',
-                'message': 'CPU usage is critically high (>95%)'
-            },
-            {
-                'name': 'high_memory_usage',
-                'condition': lambda stats: stats.get('system', {}).get('memory_percent', 0) > 85,
-                'severity': 'warning',
-                'message': 'Memory usage is above 85%'
-            },
-            {
-                'name': 'high_latency',
-                'condition': lambda stats: any(
-                    lat.get('p95', 0) > 1000 
-                    for lat in stats.get('latencies', {}).values()
-                ),
-                'severity': 'warning',
-                'message': 'High latency detected (P95 > 1000ms)'
-            },
-            {
-                'name': 'low_success_rate',
-                'condition': lambda stats: stats.get('success_rate', 1) < 0.95 and stats.get('total_calls', 0) > 10,
-                'severity': 'warning',
-                'message': 'Call success rate is below 95%'
-            }
+            AlertRule('high_cpu_usage', 'warning', 'CPU usage is above 80%',
+                      'cpu > 80'),
+            AlertRule('critical_cpu_usage', 'critical', 'CPU usage is critically high (>95%)',
+                      'cpu > 95'),
+            AlertRule('high_memory_usage', 'warning', 'Memory usage is above 85%',
+                      'mem > 85'),
+            AlertRule('high_latency', 'warning', 'High latency detected (P95 > 1000ms)',
+                      'max_p95 > 1000'),
+            AlertRule('low_success_rate', 'warning', 'Call success rate is below 95%',
+                      'success_rate < 0.95 and total_calls > 10')
         ]
         
     def check_alerts(self, performance_stats: Dict[str, Any], resource_stats: Dict[str, Any]):
         """Check alert conditions and trigger alerts"""
-        combined_stats = {
-            **performance_stats,
-            **resource_stats
-        }
-        
-        for rule in self.alert_rules:
-            alert_id = rule['name']
-            
-            try:
-                if rule['condition'](combined_stats):
-                    # Alert condition met
-                    if alert_id not in self.alerts:
-                        # New alert
-                        self.trigger_alert(alert_id, rule['severity'], rule['message'])
-                else:
-                    # Alert condition cleared
-                    if alert_id in self.alerts:
-                        self.clear_alert(alert_id)
-                        
-            except Exception as e:
-                logger.error(f"Error checking alert rule {alert_id}: {e}")
+        # Pull out every value the rules read once, instead of merging the
+        # stats dicts and re-walking them in each rule
+        system_stats = resource_stats.get('system', {})
+        snapshot = AlertSnapshot(
+            cpu=system_stats.get('cpu_percent', 0),
+            mem=system_stats.get('memory_percent', 0),
+            max_p95=max((lat.get('p95', 0) for lat in performance_stats.get('latencies', {}).values()), default=0),
+            success_rate=performance_stats.get('success_rate', 1),
+            total_calls=performance_stats.get('total_calls', 0)
+        )
+        
+        previous = self._active_mask
+        try:
+            firing = self._evaluate_rules(*snapshot)
+        except Exception as e:
+            logger.error(f"Error checking alert rules: {e}")
+            # Leave every rule in whatever state it was in
+            return
+        
+        # Only rules whose state flipped need any work
+        for index in iter_bits(firing & ~previous):
+            self.trigger_alert(index)
+        for index in iter_bits(previous & ~firing):
+            self.clear_alert(index)
                 
-    def trigger_alert(self, alert_id: str, severity: str, message: str):
-        """Trigger a new alert"""
+    def trigger_alert(self, index: int):
+        """Trigger a new alert for the rule at index"""
+        rule = self.alert_rules[index]
+        severity = rule.severity
+        message = rule.message
         alert = {
-            'id': alert_id,
+            'id': rule.name,
             'severity': severity,
             'message': message,
-            'triggered_at': datetime.now().isoformat(),
+            'triggered_at': datetime.now(),
             'status': 'active'
         }
         
-        self.alerts[alert_id] = alert
+        self._alerts[index] = alert
+        self._active_mask |= 1 << index
         self.alert_history.append(alert.copy())
         
         logger.warning(f"Alert triggered: [{severity}] {message}")
         
         # Here you could add webhook notifications, email, etc.
         
-    def clear_alert(self, alert_id: str):
-        """Clear an existing alert"""
-        if alert_id in self.alerts:
-            alert = self.alerts.pop(alert_id)
+    def clear_alert(self, index: int):
+        """Clear the active alert for the rule at index"""
+        if self._active_mask & (1 << index):
+            alert = self._alerts[index]
+            self._alerts[index] = None
+            self._active_mask &= ~(1 << index)
             alert['status'] = 'resolved'
-            alert['resolved_at'] = datetime.now().isoformat()
+            alert['resolved_at'] = datetime.now()
             self.alert_history.append(alert)
             
-            logger.info(f"Alert cleared: {alert_id}")
+            logger.info(f"Alert cleared: {alert['id']}")
             
     def get_active_alerts(self) -> List[Dict[str, Any]]:
         """Get all active alerts"""
-        return list(self.alerts.values())
+        return [self._alerts[index] for index in iter_bits(self._active_mask)]
         
     def get_alert_history(self) -> List[Dict[str, Any]]:
         """Get alert history"""
@@ -382,34 +631,58 @@ class AlertManager:
 class MetricsCollector:
     """Background metrics collector"""
     
-    def __init__(self, performance_optimizer: PerformanceOptimizer, alert_manager: AlertManager):
+    def __init__(self, performance_optimizer: PerformanceOptimizer, alert_manager: AlertManager,
+                 monitoring_server: Optional[MonitoringServer] = None):
         self.performance_optimizer = performance_optimizer
         self.alert_manager = alert_manager
+        self.monitoring_server = monitoring_server
         self.running = False
         self.collection_interval = 10  # seconds
+        self._stop = asyncio.Event()
+        self._task = None
         
     async def start(self):
         """Start metrics collection"""
         self.running = True
-        asyncio.create_task(self._collection_loop())
+        self._stop.clear()
+        self._task = asyncio.create_task(self._collection_loop())
         logger.info("Metrics collector started")
         
     async def stop(self):
         """Stop metrics collection"""
         self.running = False
+        # Wakes the loop out of its wait immediately rather than next tick
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
         logger.info("Metrics collector stopped")
         
     async def _collection_loop(self):
         """Main collection loop"""
-        while self.running:
+        loop = asyncio.get_running_loop()
+        # Ticks are scheduled on a monotonic deadline so the period stays
+        # collection_interval instead of interval + collection time
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
             try:
-                # Collect metrics
-                performance_stats = self.performance_optimizer.metrics.get_stats()
-                resource_stats = self.performance_optimizer.resource_monitor.get_stats()
+                # Collect metrics in the default executor so lock waits and
+                # percentile work never stall the HTTP handlers on this loop
+                performance_stats, resource_stats = await asyncio.gather(
+                    loop.run_in_executor(None, self.performance_optimizer.metrics.get_stats),
+                    loop.run_in_executor(None, self.performance_optimizer.resource_monitor.get_stats)
+                )
                 
                 # Check alerts
                 self.alert_manager.check_alerts(performance_stats, resource_stats)
                 
+                # Re-render /metrics and /health once per collection instead of per request
+                if self.monitoring_server is not None:
+                    await loop.run_in_executor(None, self.monitoring_server.refresh_metrics)
+                    await loop.run_in_executor(
+                        None, self.monitoring_server.refresh_health, performance_stats, resource_stats
+                    )
+                
                 # Log summary
                 if performance_stats.get('total_calls', 0) > 0:
                     logger.info(
@@ -422,7 +695,16 @@ class MetricsCollector:
             except Exception as e:
                 logger.error(f"Error in metrics collection: {e}")
                 
-            await asyncio.sleep(self.collection_interval)
+            next_tick += self.collection_interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Fell behind; skip the missed ticks rather than bursting
+                next_tick -= delay
+                delay = 0
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
 
 # Export main components
 __all__ = [
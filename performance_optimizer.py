@@ -5,9 +5,11 @@ Implements caching, connection pooling, and resource management
 """
 
 import asyncio
+import bisect
+from array import array
 import time
-from collections import deque
-from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Callable, Tuple
 from functools import lru_cache, wraps
 import logging
 import psutil
@@ -26,43 +28,146 @@ class PerformanceOptimizer:
         self.resource_monitor = ResourceMonitor()
         self.connection_pool = ConnectionPool()
         
-    def initialize(self):
-        """Initialize all performance optimization components"""
+    async def initialize(self):
+        """Initialize all performance optimization components on the running loop"""
         self.resource_monitor.start()
         logger.info("Performance optimizer initialized")
         
-    def cleanup(self):
-        """Clean up resources"""
+    async def cleanup(self):
+        """Clean up resources; awaited from the loop initialize() ran on"""
         self.resource_monitor.stop()
         self.connection_pool.close_all()
         logger.info("Performance optimizer cleaned up")
 
+# Latency histogram bucket upper bounds in ms: two significant digits
+# (1.0, 1.1 .. 9.9 per decade) from 0.1 ms to 99 s
+LATENCY_BOUNDS = [round(m / 10 * 10 ** e, 6) for e in range(-1, 5) for m in range(10, 100)]
+# Prometheus `le` buckets; each is exactly one of LATENCY_BOUNDS
+EXPORT_BOUNDS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+EXPORT_INDEXES = [bisect.bisect_left(LATENCY_BOUNDS, b) for b in EXPORT_BOUNDS]
+
+class LatencyHistogram:
+    """Fixed-bin log-linear latency histogram; O(log bins) to record, mergeable"""
+    
+    def __init__(self):
+        # Last slot counts values above the largest bound
+        self.counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        
+    def record(self, value: float):
+        """Record one value"""
+        self.counts[bisect.bisect_left(LATENCY_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+            
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's counts into this one"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        
+    def percentile(self, percentile: float) -> float:
+        """Estimate a percentile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = self.count * percentile / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = LATENCY_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = LATENCY_BOUNDS[index] if index < len(LATENCY_BOUNDS) else self.max
+                # Clamp to observed extremes so sparse buckets stay honest
+                lower = max(lower, self.min)
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+        
+    def cumulative_buckets(self) -> list:
+        """Cumulative counts at EXPORT_BOUNDS (for Prometheus `le` buckets)"""
+        buckets = []
+        cumulative = 0
+        start = 0
+        for end in EXPORT_INDEXES:
+            cumulative += sum(self.counts[start:end + 1])
+            buckets.append(cumulative)
+            start = end + 1
+        return buckets
+
+# Latencies a thread buffers before taking the lock to record them
+FLUSH_SIZE = 64
+# Components with a latency histogram ('e2e' is end-to-end)
+LATENCY_COMPONENTS = ('asr', 'llm', 'tts', 'e2e')
+
 class PerformanceMetrics:
     """Collect and track performance metrics"""
     
     def __init__(self, window_size: int = 1000):
         self.window_size = window_size
-        self.latencies = {
-            'asr': deque(maxlen=window_size),
-            'llm': deque(maxlen=window_size),
-            'tts': deque(maxlen=window_size),
-            'e2e': deque(maxlen=window_size)  # end-to-end
-        }
+        self.latencies = {component: LatencyHistogram() for component in LATENCY_COMPONENTS}
         self.success_count = 0
         self.error_count = 0
         self.call_count = 0
         self.start_time = time.time()
-        self._lock = threading.Lock()
+        # Latency recording and call counting take separate locks so neither
+        # waits on the other; each critical section is a few integer updates
+        self._latency_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        # Latencies are buffered per thread as (histogram, ms) and folded into
+        # the histograms FLUSH_SIZE at a time, or before any read. Each buffer
+        # is a deque so its owner can append while a reader drains it.
+        self._local = threading.local()
+        self._buffers = []
+        # _record_<component>_ns(delta_ns) per component, for the generated trackers
+        for component, histogram in self.latencies.items():
+            setattr(self, f'_record_{component}_ns', self._ns_recorder(histogram))
+            
+    def _ns_recorder(self, histogram: LatencyHistogram) -> Callable[[int], None]:
+        def record_ns(delta_ns: int):
+            self._buffer_latency(histogram, delta_ns / 1e6)
+        return record_ns
         
     def record_latency(self, component: str, latency_ms: float):
         """Record latency for a component"""
-        with self._lock:
-            if component in self.latencies:
-                self.latencies[component].append(latency_ms)
+        histogram = self.latencies.get(component)
+        if histogram is not None:
+            self._buffer_latency(histogram, latency_ms)
+            
+    def _buffer_latency(self, histogram: LatencyHistogram, latency_ms: float):
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = deque()
+            with self._latency_lock:
+                self._buffers.append(pending)
+        pending.append((histogram, latency_ms))
+        if len(pending) >= FLUSH_SIZE:
+            with self._latency_lock:
+                self._drain(pending)
+                
+    @staticmethod
+    def _drain(pending: deque):
+        """Record buffered latencies; caller holds the latency lock"""
+        while pending:
+            histogram, latency_ms = pending.popleft()
+            histogram.record(latency_ms)
+            
+    def _flush(self):
+        """Fold every thread's buffered latencies in; caller holds the latency lock"""
+        for pending in self._buffers:
+            self._drain(pending)
                 
     def record_call(self, success: bool = True):
         """Record a call attempt"""
-        with self._lock:
+        with self._counter_lock:
             self.call_count += 1
             if success:
                 self.success_count += 1
@@ -71,7 +176,7 @@ class PerformanceMetrics:
                 
     def get_stats(self) -> Dict[str, Any]:
         """Get current performance statistics"""
-        with self._lock:
+        with self._counter_lock:
             stats = {
                 'uptime_seconds': time.time() - self.start_time,
                 'total_calls': self.call_count,
@@ -81,75 +186,84 @@ class PerformanceMetrics:
                 'latencies': {}
             }
             
-            for component, latencies in self.latencies.items():
-                if latencies:
+        with self._latency_lock:
+            self._flush()
+            for component, histogram in self.latencies.items():
+                if histogram.count:
                     stats['latencies'][component] = {
-                        'avg': sum(latencies) / len(latencies),
-                        'min': min(latencies),
-                        'max': max(latencies),
-                        'p50': self._percentile(list(latencies), 50),
-                        'p95': self._percentile(list(latencies), 95),
-                        'p99': self._percentile(list(latencies), 99)
+                        'avg': histogram.total / histogram.count,
+                        'min': histogram.min,
+                        'max': histogram.max,
+                        'p50': histogram.percentile(50),
+                        'p95': histogram.percentile(95),
+                        'p99': histogram.percentile(99)
                     }
                     
         return stats
         
-    def _percentile(self, data: list, percentile: int) -> float:
-        """Calculate percentile of data"""
-        if not data:
-            return 0.0
-        sorted_data = sorted(data)
-        index = (len(sorted_data) - 1) * percentile / 100
-        lower = int(index)
-        upper = lower + 1
-        if upper >= len(sorted_data):
-            return sorted_data[lower]
-        return sorted_data[lower] + (sorted_data[upper] - sorted_data[lower]) * (index - lower)
+    def get_histograms(self) -> Dict[str, Any]:
+        """Snapshot each component's Prometheus buckets, sum and count"""
+        with self._latency_lock:
+            self._flush()
+            return {
+                component: (histogram.cumulative_buckets(), histogram.total, histogram.count)
+                for component, histogram in self.latencies.items()
+                if histogram.count
+            }
 
 class CacheManager:
-    """Manage caching for frequently used data"""
+    """Manage caching for frequently used data (LRU with per-entry TTL)"""
     
-    def __init__(self, ttl_seconds: int = 300):
+    def __init__(self, ttl_seconds: int = 300, maxsize: int = 1024):
         self.ttl_seconds = ttl_seconds
-        self.cache = {}
-        self.timestamps = {}
+        self.maxsize = maxsize
+        # key -> (value, expiry on the monotonic clock), least recently used first.
+        # Expired entries are dropped when they are next read or pushed out
+        # by the size bound, so no sweep is needed.
+        self.cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
         self._lock = threading.Lock()
         
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache if not expired"""
         with self._lock:
-            if key in self.cache:
-                if time.time() - self.timestamps[key] < self.ttl_seconds:
-                    return self.cache[key]
-                else:
-                    # Expired, remove from cache
-                    del self.cache[key]
-                    del self.timestamps[key]
-        return None
+            return self._get(key)
         
     def set(self, key: str, value: Any):
         """Set value in cache"""
         with self._lock:
-            self.cache[key] = value
-            self.timestamps[key] = time.time()
+            self._set(key, value)
             
     def clear(self):
         """Clear all cache entries"""
         with self._lock:
             self.cache.clear()
-            self.timestamps.clear()
             
-    def cleanup_expired(self):
-        """Remove expired entries from cache"""
-        with self._lock:
-            current_time = time.time()
-            expired_keys = [
-                key for key, timestamp in self.timestamps.items()
-                if current_time - timestamp >= self.ttl_seconds
-            ]
-            for key in expired_keys:
-                del self.cache[key]
-                del self.timestamps[key]
+    def _get(self, key: str) -> Optional[Any]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            # Expired, remove from cache
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return value
+        
+    def _set(self, key: str, value: Any):
+        self.cache[key] = (value, time.monotonic() + self.ttl_seconds)
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+class AsyncCacheManager(CacheManager):
+    """CacheManager for a single event loop; loop-affine, so get/set skip the lock"""
+    
+    get = CacheManager._get
+    set = CacheManager._set
+
+# Resource checks between disk usage samples
+DISK_CHECK_TICKS = 10
 
 class ResourceMonitor:
     """Monitor system resources and provide alerts"""
@@ -157,53 +271,68 @@ class ResourceMonitor:
     def __init__(self, check_interval: int = 30):
         self.check_interval = check_interval
         self.running = False
-        self.thread = None
+        self.task = None
+        # Reused across ticks; psutil keeps per-process CPU state on it
+        self.process = psutil.Process()
         self.thresholds = {
             'cpu_percent': 80.0,
             'memory_percent': 85.0,
             'disk_percent': 90.0
         }
         self.current_stats = {}
+        # Disk usage changes slowly, so it is sampled every DISK_CHECK_TICKS ticks
+        self._tick = 0
+        self._disk = None
         
     def start(self):
-        """Start resource monitoring"""
+        """Start resource monitoring as a task on the running event loop"""
         self.running = True
-        self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self.thread.start()
+        # cpu_percent(interval=None) reports usage since the previous call,
+        # so prime both counters once and never block waiting for a sample
+        psutil.cpu_percent(interval=None)
+        self.process.cpu_percent()
+        self.task = asyncio.get_running_loop().create_task(self._monitor_loop())
         
     def stop(self):
         """Stop resource monitoring"""
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=5)
+        if self.task:
+            self.task.cancel()
+            self.task = None
             
-    def _monitor_loop(self):
+    async def _monitor_loop(self):
         """Main monitoring loop"""
+        # First sample after a second, so the CPU reading covers a real interval
+        delay = min(1.0, self.check_interval)
         while self.running:
+            await asyncio.sleep(delay)
             self._check_resources()
-            time.sleep(self.check_interval)
+            delay = self.check_interval
             
     def _check_resources(self):
         """Check current resource usage"""
         try:
             # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = psutil.cpu_percent(interval=None)
             
             # Memory usage
             memory = psutil.virtual_memory()
             memory_percent = memory.percent
             
             # Disk usage
-            disk = psutil.disk_usage('/')
+            if self._disk is None or self._tick % DISK_CHECK_TICKS == 0:
+                self._disk = psutil.disk_usage('/')
+            self._tick += 1
+            disk = self._disk
             disk_percent = disk.percent
             
             # Network stats
             network = psutil.net_io_counters()
             
-            # Process-specific stats
-            process = psutil.Process()
-            process_memory = process.memory_info().rss / 1024 / 1024  # MB
-            process_cpu = process.cpu_percent()
+            # Process-specific stats, read in one pass over /proc/self
+            process = self.process.as_dict(attrs=['memory_info', 'cpu_percent', 'num_threads'])
+            process_memory = process['memory_info'].rss / 1024 / 1024  # MB
+            process_cpu = process['cpu_percent']
             
             self.current_stats = {
                 'system': {
@@ -218,7 +347,7 @@ class ResourceMonitor:
                 'process': {
                     'memory_mb': process_memory,
                     'cpu_percent': process_cpu,
-                    'num_threads': process.num_threads()
+                    'num_threads': process['num_threads']
                 }
             }
             
@@ -238,169 +367,315 @@ class ResourceMonitor:
         return self.current_stats.copy()
 
 class ConnectionPool:
-    """Manage connection pooling for various services"""
+    """Manage connection pooling for various services
+    
+    Loop-affine: acquire and release from one event loop. Idle connections
+    are reused most recently released first; ones idle longer than idle_ttl,
+    or beyond max_idle, are closed.
+    """
     
-    def __init__(self, max_connections: int = 10):
+    def __init__(self, max_connections: int = 10, max_idle: Optional[int] = None,
+                 idle_ttl: float = 300.0):
         self.max_connections = max_connections
+        self.max_idle = max_idle
+        self.idle_ttl = idle_ttl
         self.pools = {}
-        self._lock = threading.Lock()
         
-    def get_connection(self, service: str, factory: Callable):
-        """Get a connection from the pool or create a new one"""
-        with self._lock:
-            if service not in self.pools:
-                self.pools[service] = {
-                    'connections': [],
-                    'in_use': set(),
-                    'factory': factory
-                }
-                
-            pool = self.pools[service]
-            
-            # Try to get an available connection
-            for conn in pool['connections']:
-                if conn not in pool['in_use']:
-                    pool['in_use'].add(conn)
-                    return conn
-                    
-            # Create new connection if under limit
-            if len(pool['connections']) < self.max_connections:
-                conn = factory()
-                pool['connections'].append(conn)
-                pool['in_use'].add(conn)
-                return conn
-                
-            # Wait for a connection to become available
-            logger.warning(f"Connection pool for {service} is full")
-            return None
+    def _get_pool(self, service: str, factory: Callable) -> Dict[str, Any]:
+        pool = self.pools.get(service)
+        if pool is None:
+            pool = self.pools[service] = {
+                'free': deque(),  # (connection, released_at), oldest on the left
+                'alive': 0,       # idle plus checked out
+                'sem': asyncio.Semaphore(self.max_connections),
+                'factory': factory
+            }
+        return pool
+        
+    async def get_connection(self, service: str, factory: Callable):
+        """Get a connection from the pool, waiting while all of them are in use"""
+        pool = self._get_pool(service, factory)
+        await pool['sem'].acquire()
+        
+        free = pool['free']
+        expire_before = time.monotonic() - self.idle_ttl
+        while free and free[0][1] < expire_before:
+            self._close(service, free.popleft()[0])
+            pool['alive'] -= 1
+        if free:
+            return free.pop()[0]
             
+        # Create new connection; the semaphore keeps this under the limit
+        try:
+            conn = pool['factory']()
+        except Exception:
+            pool['sem'].release()
+            raise
+        pool['alive'] += 1
+        return conn
+        
     def release_connection(self, service: str, connection):
         """Release a connection back to the pool"""
-        with self._lock:
-            if service in self.pools:
-                pool = self.pools[service]
-                if connection in pool['in_use']:
-                    pool['in_use'].remove(connection)
+        pool = self.pools.get(service)
+        if pool is None:
+            # Pool was closed while the connection was checked out
+            self._close(service, connection)
+        elif self.max_idle is not None and len(pool['free']) >= self.max_idle:
+            self.close_one(service, connection)
+        else:
+            pool['free'].append((connection, time.monotonic()))
+            pool['sem'].release()
+            
+    def close_one(self, service: str, connection):
+        """Close a checked-out connection instead of returning it, e.g. after an error"""
+        pool = self.pools.get(service)
+        self._close(service, connection)
+        if pool is not None:
+            pool['alive'] -= 1
+            pool['sem'].release()
+        
+    def _close(self, service: str, conn):
+        try:
+            if hasattr(conn, 'close'):
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error closing connection for {service}: {e}")
                     
     def close_all(self):
-        """Close all connections in all pools"""
-        with self._lock:
-            for service, pool in self.pools.items():
-                for conn in pool['connections']:
-                    try:
-                        if hasattr(conn, 'close'):
-                            conn.close()
-                    except Exception as e:
-                        logger.error(f"Error closing connection for {service}: {e}")
-            self.pools.clear()
+        """Close all idle connections; checked-out ones are closed when released"""
+        for service, pool in self.pools.items():
+            for conn, _ in pool['free']:
+                self._close(service, conn)
+        self.pools.clear()
+
+def _find_optimizer(args) -> Optional[PerformanceOptimizer]:
+    """First performance_optimizer attribute among the call arguments (usually self)"""
+    for arg in args:
+        optimizer = getattr(arg, 'performance_optimizer', None)
+        if optimizer is not None:
+            return optimizer
+    return None
+
+# Tracker wrapper source; generated per decorated function so the
+# component's recorder is a direct attribute rather than a keyed lookup
+TRACKER_TEMPLATE = """
+async def wrapper(*args, **kwargs):
+    start_ns = perf_counter_ns()
+    try:
+        result = await func(*args, **kwargs)
+    except Exception:
+        # Record failure
+        target = optimizer or find_optimizer(args)
+        if target is not None:
+            target.metrics.record_call(success=False)
+        raise
+    target = optimizer or find_optimizer(args)
+    if target is not None:
+        {record}
+    return result
+"""
+
+def _build_tracker(func: Callable, component: str, optimizer: Optional[PerformanceOptimizer],
+                   is_async: bool) -> Callable:
+    """Generate a timing wrapper for func with the component baked in"""
+    if component in LATENCY_COMPONENTS:
+        record = f"target.metrics._record_{component}_ns(perf_counter_ns() - start_ns)"
+    else:
+        record = "target.metrics.record_latency(component, (perf_counter_ns() - start_ns) / 1e6)"
+    source = TRACKER_TEMPLATE.replace('{record}', record)
+    if not is_async:
+        source = source.replace('async def', 'def').replace('await ', '')
+    namespace = {
+        'func': func,
+        'component': component,
+        'optimizer': optimizer,
+        'find_optimizer': _find_optimizer,
+        'perf_counter_ns': time.perf_counter_ns
+    }
+    exec(compile(source, f'<{component} tracker>', 'exec'), namespace)
+    return wraps(func)(namespace['wrapper'])
 
-def async_performance_tracker(component: str):
-    """Decorator to track performance of async functions"""
+def async_performance_tracker(component: str, optimizer: Optional[PerformanceOptimizer] = None):
+    """Decorator to track performance of async functions
+    
+    Pass optimizer to bind it up front; otherwise it is looked up on the
+    call arguments.
+    """
     def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            start_time = time.perf_counter()
-            try:
-                result = await func(*args, **kwargs)
-                latency_ms = (time.perf_counter() - start_time) * 1000
-                
-                # Get performance optimizer if available in args
-                for arg in args:
-                    if hasattr(arg, 'performance_optimizer'):
-                        arg.performance_optimizer.metrics.record_latency(component, latency_ms)
-                        break
-                        
-                return result
-            except Exception as e:
-                # Record failure
-                for arg in args:
-                    if hasattr(arg, 'performance_optimizer'):
-                        arg.performance_optimizer.metrics.record_call(success=False)
-                        break
-                raise e
-        return wrapper
+        return _build_tracker(func, component, optimizer, is_async=True)
     return decorator
 
-def performance_tracker(component: str):
-    """Decorator to track performance of sync functions"""
+def performance_tracker(component: str, optimizer: Optional[PerformanceOptimizer] = None):
+    """Decorator to track performance of sync functions
+    
+    Pass optimizer to bind it up front; otherwise it is looked up on the
+    call arguments.
+    """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            start_time = time.perf_counter()
-            try:
-                result = func(*args, **kwargs)
-                latency_ms = (time.perf_counter() - start_time) * 1000
-                
-                # Get performance optimizer if available in args
-                for arg in args:
-                    if hasattr(arg, 'performance_optimizer'):
-                        arg.performance_optimizer.metrics.record_latency(component, latency_ms)
-                        break
-                        
-                return result
-            except Exception as e:
-                # Record failure
-                for arg in args:
-                    if hasattr(arg, 'performance_optimizer'):
-                        arg.performance_optimizer.metrics.record_call(success=False)
-                        break
-                raise e
-        return wrapper
+        return _build_tracker(func, component, optimizer, is_async=False)
     return decorator
 
+# One 20 ms frame of 8 kHz μ-law
+FRAME_BYTES = 160
+
+class AudioRing:
+    """FIFO of audio chunks stored back to back in one preallocated bytearray
+    
+    Appending copies into the ring instead of keeping a bytes object per
+    chunk; once max_chunks chunks or capacity bytes are held, the oldest
+    chunks are dropped, like a deque with maxlen.
+    """
+    
+    def __init__(self, max_chunks: int, capacity: int):
+        self.max_chunks = max_chunks
+        self.lengths = array('I', bytes(4 * max_chunks))  # ring of chunk sizes
+        self._allocate(capacity)
+        # Guards this stream only, for callers sharing the ring across threads
+        self.lock = threading.Lock()
+        
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # byte offset of the oldest chunk
+        self.used = 0   # bytes held
+        self.first = 0  # lengths index of the oldest chunk
+        self.count = 0
+        
+    def __len__(self) -> int:
+        return self.count
+        
+    def append(self, data: bytes):
+        """Add a chunk, dropping the oldest ones if the ring is full"""
+        size = len(data)
+        if size > self.capacity:
+            self._grow(size)
+        while self.count == self.max_chunks or self.used + size > self.capacity:
+            self._drop_oldest()
+            
+        end = (self.start + self.used) % self.capacity
+        if end + size <= self.capacity:
+            self.buffer[end:end + size] = data
+        else:
+            # Wrap around the end of the ring
+            split = self.capacity - end
+            data = memoryview(data)
+            self.buffer[end:] = data[:split]
+            self.buffer[:size - split] = data[split:]
+        self.lengths[(self.first + self.count) % self.max_chunks] = size
+        self.count += 1
+        self.used += size
+        
+    def popleft(self) -> bytes:
+        """Remove and return the oldest chunk"""
+        size = self.lengths[self.first]
+        start = self.start
+        if start + size <= self.capacity:
+            chunk = bytes(self.view[start:start + size])
+        else:
+            chunk = bytes(self.view[start:]) + bytes(self.view[:start + size - self.capacity])
+        self._drop_oldest()
+        return chunk
+        
+    def clear(self):
+        """Drop every chunk"""
+        self.start = self.used = self.first = self.count = 0
+        
+    def _drop_oldest(self):
+        self.start = (self.start + self.lengths[self.first]) % self.capacity
+        self.used -= self.lengths[self.first]
+        self.first = (self.first + 1) % self.max_chunks
+        self.count -= 1
+        if not self.count:
+            # Empty again; restart at offset 0 so later chunks rarely wrap
+            self.start = self.first = 0
+            
+    def _grow(self, size: int):
+        """Enlarge the ring to hold a chunk bigger than its capacity"""
+        chunks = [self.popleft() for _ in range(self.count)]
+        self.view.release()
+        self._allocate(max(size, self.capacity * 2))
+        for chunk in chunks:
+            self.append(chunk)
+
 # Optimized buffer management
 class AudioBufferManager:
     """Manage audio buffers efficiently"""
     
-    def __init__(self, max_buffer_size: int = 100):
+    def __init__(self, max_buffer_size: int = 100, chunk_bytes: int = FRAME_BYTES):
         self.max_buffer_size = max_buffer_size
-        self.buffers = {}
+        # Per-stream ring size in bytes; sized for max_buffer_size typical chunks
+        self.ring_bytes = max_buffer_size * chunk_bytes
+        self.buffers: Dict[str, AudioRing] = {}
         self._lock = threading.Lock()
         
     def add_audio(self, stream_id: str, audio_data: bytes):
         """Add audio data to buffer"""
-        with self._lock:
-            if stream_id not in self.buffers:
-                self.buffers[stream_id] = deque(maxlen=self.max_buffer_size)
-            self.buffers[stream_id].append(audio_data)
+        # Only creating a stream takes the manager lock; after that each
+        # stream's own lock is only ever contended by its reader
+        buffer = self.buffers.get(stream_id) or self._create_stream(stream_id)
+        with buffer.lock:
+            buffer.append(audio_data)
             
     def get_audio(self, stream_id: str, max_chunks: int = None) -> list:
         """Get audio chunks from buffer"""
+        buffer = self.buffers.get(stream_id)
+        if buffer is None:
+            return []
+        with buffer.lock:
+            return self._pop_chunks(buffer, max_chunks)
+            
+    def _create_stream(self, stream_id: str) -> AudioRing:
         with self._lock:
-            if stream_id not in self.buffers:
-                return []
-                
-            buffer = self.buffers[stream_id]
-            if max_chunks is None:
-                chunks = list(buffer)
-                buffer.clear()
-            else:
-                chunks = []
-                for _ in range(min(max_chunks, len(buffer))):
-                    chunks.append(buffer.popleft())
-                    
-            return chunks
+            return self.buffers.setdefault(stream_id, AudioRing(self.max_buffer_size, self.ring_bytes))
+            
+    def _add_audio(self, stream_id: str, audio_data: bytes):
+        buffer = self.buffers.get(stream_id)
+        if buffer is None:
+            buffer = self.buffers[stream_id] = AudioRing(self.max_buffer_size, self.ring_bytes)
+        buffer.append(audio_data)
+        
+    def _get_audio(self, stream_id: str, max_chunks: int = None) -> list:
+        buffer = self.buffers.get(stream_id)
+        if buffer is None:
+            return []
+        return self._pop_chunks(buffer, max_chunks)
+        
+    @staticmethod
+    def _pop_chunks(buffer: AudioRing, max_chunks: Optional[int]) -> list:
+        count = len(buffer) if max_chunks is None else min(max_chunks, len(buffer))
+        return [buffer.popleft() for _ in range(count)]
             
     def clear_buffer(self, stream_id: str):
         """Clear buffer for a stream"""
-        with self._lock:
-            if stream_id in self.buffers:
-                self.buffers[stream_id].clear()
+        buffer = self.buffers.get(stream_id)
+        if buffer is not None:
+            with buffer.lock:
+                buffer.clear()
                 
     def remove_stream(self, stream_id: str):
         """Remove a stream buffer"""
         with self._lock:
-            if stream_id in self.buffers:
-                del self.buffers[stream_id]
+            self.buffers.pop(stream_id, None)
+
+class AsyncAudioBufferManager(AudioBufferManager):
+    """AudioBufferManager for a single event loop; loop-affine, so the per-chunk paths skip the lock"""
+    
+    add_audio = AudioBufferManager._add_audio
+    get_audio = AudioBufferManager._get_audio
 
 # Export the main components
 __all__ = [
     'PerformanceOptimizer',
     'PerformanceMetrics',
+    'LatencyHistogram',
     'CacheManager',
+    'AsyncCacheManager',
     'ResourceMonitor',
     'ConnectionPool',
+    'AudioRing',
     'AudioBufferManager',
+    'AsyncAudioBufferManager',
     'async_performance_tracker',
     'performance_tracker'
 ]
@@ -2,13 +2,65 @@
 """
 Proxy server to handle both TwiML and WebSocket through single ngrok tunnel
 """
-from aiohttp import web
+from aiohttp import web, WSMsgType
 import aiohttp
+import asyncio
 import logging
+from multidict import CIMultiDict
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connection-specific headers that must not be forwarded; aiohttp sets its own
+HOP_BY_HOP_HEADERS = frozenset({
+    'host', 'connection', 'keep-alive', 'upgrade', 'content-length', 'transfer-encoding',
+    'proxy-connection', 'te', 'trailer'
+})
+
+def forward_headers(headers):
+    """Copy headers without the hop-by-hop ones"""
+    return CIMultiDict((name, value) for name, value in headers.items() if name.lower() not in HOP_BY_HOP_HEADERS)
+
+# Message types relayed as-is (their values are the frame opcodes);
+# anything else (close, error) ends the relay
+RELAY_TYPES = frozenset({WSMsgType.TEXT, WSMsgType.BINARY, WSMsgType.PING, WSMsgType.PONG})
+# Read size when relaying HTTP response bodies
+STREAM_CHUNK_SIZE = 64 * 1024
+# Media stream messages are a JSON-wrapped 20 ms frame, far below this
+MAX_WS_MESSAGE = 64 * 1024
+# send_frame (aiohttp 3.11+) writes a prepared payload without re-validating it
+SEND_FRAME = hasattr(web.WebSocketResponse, 'send_frame')
+
+async def start_session(app):
+    """Create the backend session shared by every proxied request"""
+    # Bodies are relayed as received, so leave Content-Encoding'd payloads alone
+    app['session'] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=0, limit_per_host=64, keepalive_timeout=60),
+        auto_decompress=False
+    )
+
+async def close_session(app):
+    await app['session'].close()
+
+async def relay(source, destination):
+    """Forward WebSocket frames from source to destination until either side closes"""
+    async for msg in source:
+        msg_type = msg.type
+        if msg_type not in RELAY_TYPES:
+            break
+        if msg_type == WSMsgType.TEXT:
+            await destination.send_str(msg.data)
+        elif SEND_FRAME:
+            # Write the payload as a single frame of the same opcode
+            await destination.send_frame(msg.data, msg_type)
+        elif msg_type == WSMsgType.BINARY:
+            await destination.send_bytes(msg.data)
+        elif msg_type == WSMsgType.PING:
+            await destination.ping(msg.data)
+        else:
+            await destination.pong(msg.data)
+    await destination.close()
+
 async def handle_proxy(request):
     """Proxy requests based on path"""
     path = request.path_qs
@@ -25,60 +77,54 @@ async def handle_proxy(request):
     
     # Handle WebSocket upgrade
     if request.headers.get('Upgrade') == 'websocket':
-        ws = web.WebSocketResponse()
+        # Pings are relayed end to end rather than answered here, and
+        # localhost traffic is never worth deflating
+        ws = web.WebSocketResponse(autoping=False, compress=False, heartbeat=None,
+                                   max_msg_size=MAX_WS_MESSAGE)
         await ws.prepare(request)
         
-        # Connect to backend WebSocket
-        session = aiohttp.ClientSession()
-        try:
-            async with session.ws_connect('ws://localhost:8080') as backend_ws:
-                # Relay messages
-                async def relay_to_backend():
-                    async for msg in ws:
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            await backend_ws.send_str(msg.data)
-                        elif msg.type == aiohttp.WSMsgType.BINARY:
-                            await backend_ws.send_bytes(msg.data)
-                        else:
-                            break
-                
-                async def relay_to_client():
-                    async for msg in backend_ws:
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            await ws.send_str(msg.data)
-                        elif msg.type == aiohttp.WSMsgType.BINARY:
-                            await ws.send_bytes(msg.data)
-                        else:
-                            break
-                
-                # Run both relay tasks
-                import asyncio
-                await asyncio.gather(relay_to_backend(), relay_to_client())
-        finally:
-            await session.close()
+        # Connect to backend WebSocket over the shared session
+        session = request.app['session']
+        async with session.ws_connect(f"ws://localhost:8080{path}", autoping=False, compress=0,
+                                      heartbeat=None, receive_timeout=None,
+                                      max_msg_size=MAX_WS_MESSAGE) as backend_ws:
+            # Run both relay directions
+            await asyncio.gather(relay(ws, backend_ws), relay(backend_ws, ws))
         
         return ws
     
     # Handle regular HTTP requests
-    async with aiohttp.ClientSession() as session:
-        # Forward the request
-        data = await request.read() if request.body_exists else None
-        
-        async with session.request(
-            method=request.method,
-            url=target_url,
-            headers=request.headers,
-            data=data
-        ) as response:
-            body = await response.read()
-            return web.Response(
-                body=body,
-                status=response.status,
-                headers=response.headers
-            )
+    session = request.app['session']
+    # Forward the request body as it arrives instead of buffering it
+    headers = forward_headers(request.headers)
+    if request.content_length is not None:
+        # Keep the known length so the backend is not sent a chunked body
+        headers['Content-Length'] = str(request.content_length)
+    data = request.content if request.body_exists else None
+    
+    async with session.request(
+        method=request.method,
+        url=target_url,
+        headers=headers,
+        data=data
+    ) as response:
+        proxied = web.StreamResponse(
+            status=response.status,
+            headers=forward_headers(response.headers)
+        )
+        if response.content_length is not None:
+            # Bodies are not decompressed, so the upstream length still holds
+            proxied.content_length = response.content_length
+        await proxied.prepare(request)
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            await proxied.write(chunk)
+        await proxied.write_eof()
+        return proxied
 
 async def create_app():
     app = web.Application()
+    app.on_startup.append(start_session)
+    app.on_cleanup.append(close_session)
     app.router.add_route('*', '/{path:.*}', handle_proxy)
     return app
 
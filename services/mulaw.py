@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+G.711 μ-law <-> 16-bit PCM conversion using NumPy lookup tables
+"""
+import numpy as np
+
+BIAS = 0x84
+CLIP = 8159
+# Upper bound of each μ-law segment in 14-bit magnitude
+SEG_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32)
+
+def _build_decode_table() -> np.ndarray:
+    """Linear value for every one of the 256 μ-law code points"""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((u & 0x0F) << 3) + BIAS) << ((u & 0x70) >> 4)
+    return np.where(u & 0x80, BIAS - t, t - BIAS).astype(np.int16)
+
+def _build_encode_table() -> np.ndarray:
+    """μ-law code for every 16-bit sample, indexed by its unsigned bit pattern"""
+    pcm = np.arange(65536, dtype=np.int32).astype(np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), CLIP) + (BIAS >> 2)
+    seg = np.searchsorted(SEG_END, magnitude)
+    ulaw = (seg << 4) | ((magnitude >> (seg + 1)) & 0x0F)
+    return ((np.where(seg >= 8, 0x7F, ulaw) ^ mask) & 0xFF).astype(np.uint8)
+
+ULAW_TO_LINEAR = _build_decode_table()
+LINEAR_TO_ULAW = _build_encode_table()
+
+def decode(ulaw_data: bytes) -> np.ndarray:
+    """Convert μ-law bytes to int16 PCM samples"""
+    return ULAW_TO_LINEAR[np.frombuffer(ulaw_data, dtype=np.uint8)]
+
+def encode(pcm_data: bytes) -> bytes:
+    """Convert 16-bit PCM bytes to μ-law bytes"""
+    return LINEAR_TO_ULAW[np.frombuffer(pcm_data, dtype=np.uint16)].tobytes()
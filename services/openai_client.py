@@ -8,24 +8,37 @@ import os
 from typing import List, Dict, Optional, AsyncGenerator
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
-from collections import defaultdict
+from collections import OrderedDict, deque
 import json
+import re
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Messages of context kept per caller
+HISTORY_LENGTH = 10
+# Callers whose history is kept; the least recently active is evicted first
+MAX_CALLERS = 1000
+
 class ConversationManager:
-    def __init__(self, openai_client):
+    def __init__(self, openai_client, max_callers: int = MAX_CALLERS):
         self.openai_client = openai_client
-        self.conversations = defaultdict(list)  # Store conversation history by caller_id
+        # Recent history by caller_id, least recently active first. Callers
+        # are removed on hangup (clear_conversation) or when over max_callers.
+        # Keys stay the caller_id strings: a str caches its hash, so each turn's
+        # lookup with the connection's caller_id costs no rehashing.
+        self.max_callers = max_callers
+        self.conversations: "OrderedDict[str, deque]" = OrderedDict()
         self.system_prompt = """You are a helpful AI assistant on a phone call. 
         Keep your responses concise and natural for voice conversation.
         Be friendly, professional, and helpful.
         Avoid using markdown, special characters, or formatting that doesn't work well with speech.
         If you need to provide lists, speak them naturally.
         Remember this is a phone conversation, so responses should be conversational."""
+        # Built once; an identical leading message keeps the request prefix stable
+        self.system_message = {"role": "system", "content": self.system_prompt}
         
     async def get_response(self, text: str, caller_id: str, stream: bool = True) -> AsyncGenerator[str, None]:
         """
@@ -41,12 +54,11 @@ class ConversationManager:
         """
         try:
             # Add user message to conversation history
-            self.conversations[caller_id].append({"role": "user", "content": text})
+            history = self.get_history(caller_id)
+            history.append({"role": "user", "content": text})
             
             # Prepare messages with system prompt and conversation history
-            messages = [
-                {"role": "system", "content": self.system_prompt}
-            ] + self.conversations[caller_id][-10:]  # Keep last 10 messages for context
+            messages = [self.system_message, *history]
             
             # Call OpenAI API
             if stream:
@@ -66,7 +78,7 @@ class ConversationManager:
                         yield content
                 
                 # Add assistant response to history
-                self.conversations[caller_id].append({"role": "assistant", "content": full_response})
+                history.append({"role": "assistant", "content": full_response})
                 
             else:
                 response = await self.openai_client.chat.completions.create(
@@ -77,13 +89,24 @@ class ConversationManager:
                 )
                 
                 content = response.choices[0].message.content
-                self.conversations[caller_id].append({"role": "assistant", "content": content})
+                history.append({"role": "assistant", "content": content})
                 yield content
                 
         except Exception as e:
             logger.error(f"Error getting OpenAI response: {e}")
             yield "I apologize, but I'm having trouble processing that right now."
     
+    def get_history(self, caller_id: str) -> deque:
+        """History for a caller, created on first use and marked most recently active"""
+        history = self.conversations.get(caller_id)
+        if history is None:
+            history = self.conversations[caller_id] = deque(maxlen=HISTORY_LENGTH)
+            if len(self.conversations) > self.max_callers:
+                self.conversations.popitem(last=False)
+        else:
+            self.conversations.move_to_end(caller_id)
+        return history
+    
     def clear_conversation(self, caller_id: str):
         """Clear conversation history for a caller"""
         if caller_id in self.conversations:
@@ -95,7 +118,7 @@ class ConversationManager:
         if caller_id not in self.conversations:
             return "No conversation history"
         
-        return json.dumps(self.conversations[caller_id], indent=2)
+        return json.dumps(list(self.conversations[caller_id]), indent=2)
 
 class OpenAIClient:
     def __init__(self):
@@ -127,43 +150,42 @@ class OpenAIClient:
         """Clear conversation history for a specific caller"""
         self.conversation_manager.clear_conversation(caller_id)
 
+# Sentence terminator followed by whitespace; a terminator at the very end
+# of the buffer may still be mid-token (e.g. "3." before "14"), so wait
+SENTENCE_END = re.compile(r'[.!?]\s+')
+
 # Response buffer for managing streaming responses
 class ResponseBuffer:
     def __init__(self):
-        self.buffer = []
+        self.buffer = ""  # text not yet returned as a complete sentence
         self.complete = False
         
     def add_chunk(self, chunk: str):
         """Add a chunk to the buffer"""
-        self.buffer.append(chunk)
+        self.buffer += chunk
     
     def get_complete_sentences(self) -> List[str]:
         """Extract complete sentences from buffer"""
-        text = ''.join(self.buffer)
         sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            # Keep each sentence's own terminator, drop the whitespace after it
+            sentences.append(self.buffer[start:match.start() + 1])
+            start = match.end()
         
-        # Simple sentence detection (can be improved)
-        import re
-        sentence_endings = re.compile(r'[.!?]\s+')
-        parts = sentence_endings.split(text)
-        
-        if len(parts) > 1:
-            # We have at least one complete sentence
-            for i in range(len(parts) - 1):
-                sentences.append(parts[i] + text[sentence_endings.search(text).group(0)])
-            
+        if start:
             # Keep the incomplete part in buffer
-            self.buffer = [parts[-1]]
+            self.buffer = self.buffer[start:]
         
         return sentences
     
     def get_remaining(self) -> str:
         """Get any remaining text in buffer"""
-        return ''.join(self.buffer)
+        return self.buffer
     
     def clear(self):
         """Clear the buffer"""
-        self.buffer = []
+        self.buffer = ""
         self.complete = False
 
 if __name__ == "__main__":
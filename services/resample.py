@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Streaming 2:1 resampling of 16-bit PCM (8 kHz <-> 16 kHz) with a polyphase FIR
+"""
+import numpy as np
+
+# Kaiser-windowed sinc low-pass at the 8 kHz Nyquist (a quarter of 16 kHz),
+# 16 taps per phase; unity DC gain at the 16 kHz rate
+TAPS = 32
+_n = np.arange(TAPS) - (TAPS - 1) / 2
+LOWPASS = 0.5 * np.sinc(0.5 * _n) * np.kaiser(TAPS, 8.0)
+LOWPASS /= LOWPASS.sum()
+# Upsampling inserts a zero between samples, so each phase carries gain 2
+UP_PHASES = (2 * LOWPASS[0::2], 2 * LOWPASS[1::2])
+
+def _to_pcm(samples: np.ndarray) -> bytes:
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16).tobytes()
+
+class Resampler:
+    """Fixed-ratio 8 kHz <-> 16 kHz resampler for one audio stream
+
+    Keeps the filter history between chunks, so consecutive 20 ms chunks
+    join without the edge clicks of resampling each one from scratch.
+    """
+
+    def __init__(self, from_rate: int, to_rate: int):
+        if to_rate == 2 * from_rate:
+            self.up = True
+            self.tail = np.zeros(TAPS // 2 - 1)
+        elif from_rate == 2 * to_rate:
+            self.up = False
+            self.tail = np.zeros(TAPS - 1)
+        else:
+            raise ValueError(f"Unsupported resampling ratio {from_rate} -> {to_rate}")
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        # Downsampling keeps every other filtered sample; 1 skips the first one
+        self.phase = 0
+
+    def process(self, audio_data: bytes) -> bytes:
+        """Resample a chunk of 16-bit PCM"""
+        samples = np.frombuffer(audio_data, dtype=np.int16)
+        if not len(samples):
+            return b''
+        signal = np.concatenate((self.tail, samples))
+
+        if self.up:
+            out = np.empty(2 * len(samples))
+            out[0::2] = np.convolve(signal, UP_PHASES[0], 'valid')
+            out[1::2] = np.convolve(signal, UP_PHASES[1], 'valid')
+            self.tail = signal[-(TAPS // 2 - 1):]
+        else:
+            filtered = np.convolve(signal, LOWPASS, 'valid')
+            out = filtered[self.phase::2]
+            self.phase = (self.phase - len(filtered)) % 2
+            self.tail = signal[-(TAPS - 1):]
+
+        return _to_pcm(out)
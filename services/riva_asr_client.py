@@ -3,29 +3,46 @@
 RIVA ASR Client for speech-to-text processing
 """
 import asyncio
-import grpc
+import grpc.aio
 import logging
+import queue
+import threading
+from contextlib import aclosing
 import numpy as np
 from typing import Optional, AsyncGenerator
 import riva.client
 import os
 from dotenv import load_dotenv
-import audioop
+from resample import Resampler
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Most 20 ms chunks sent to RIVA in one request when audio has queued up
+BATCH_CHUNKS = 5
+
+# Keep the shared channel warm between calls so a new call's stream doesn't
+# pay for reconnecting after the channel went idle
+GRPC_CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 10000),
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.max_pings_without_data', 0),
+]
+
 class RivaASRClient:
     def __init__(self):
         self.server = f"{os.getenv('RIVA_SERVER_HOST', 'localhost')}:{os.getenv('RIVA_SERVER_PORT', '50051')}"
         self.auth = None
         
         try:
-            # Use the new RIVA client API
-            # Use the new RIVA client API
-            self.auth = riva.client.Auth(uri=self.server)
+            # Use the new RIVA client API. The channel it opens is shared by
+            # every call; each call holds one StreamingRecognize stream on it
+            try:
+                self.auth = riva.client.Auth(uri=self.server, options=GRPC_CHANNEL_OPTIONS)
+            except TypeError:  # riva-client releases before channel options
+                self.auth = riva.client.Auth(uri=self.server)
             self.asr_service = riva.client.ASRService(self.auth)
             
             # Configure ASR settings
@@ -50,51 +67,112 @@ class RivaASRClient:
         """Fallback to direct gRPC API if new client fails"""
         from riva.client.proto import riva_asr_pb2, riva_asr_pb2_grpc
         
-        self.channel = grpc.insecure_channel(self.server)
+        # grpc.aio so fallback calls run on the event loop instead of blocking it
+        self.channel = grpc.aio.insecure_channel(self.server, options=GRPC_CHANNEL_OPTIONS)
         self.stub = riva_asr_pb2_grpc.RivaSpeechRecognitionStub(self.channel)
         
         # Create streaming recognition config
-        self.config = riva_asr_pb2.RecognitionConfig(
-            encoding=1,  # LINEAR_PCM = 1
-            sample_rate_hertz=16000,
-            language_code="en-US",
-            max_alternatives=1,
-            enable_automatic_punctuation=True,
-            enable_word_time_offsets=False,
+        self.config = riva_asr_pb2.StreamingRecognitionConfig(
+            config=riva_asr_pb2.RecognitionConfig(
+                encoding=1,  # LINEAR_PCM = 1
+                sample_rate_hertz=16000,
+                language_code="en-US",
+                max_alternatives=1,
+                enable_automatic_punctuation=True,
+                enable_word_time_offsets=False,
+            ),
+            interim_results=True,
         )
+        self.request_type = riva_asr_pb2.StreamingRecognizeRequest
         self.use_direct_grpc = True
         logger.info(f"Using fallback gRPC API for RIVA ASR")
     
     def resample_audio(self, audio_data: bytes, from_rate: int = 8000, to_rate: int = 16000) -> bytes:
-        """Resample audio from one sample rate to another"""
-        resampled, _ = audioop.ratecv(audio_data, 2, 1, from_rate, to_rate, None)
-        return resampled
+        """Resample a standalone clip from one sample rate to another"""
+        return Resampler(from_rate, to_rate).process(audio_data)
+    
+    async def threaded_responses(self, pcm_stream: AsyncGenerator[bytes, None]) -> AsyncGenerator:
+        """RIVA streaming call through the blocking riva.client API"""
+        loop = asyncio.get_running_loop()
+        # The RIVA client is synchronous, so the call runs on its own thread;
+        # audio is handed over as it arrives and responses come back to the loop
+        requests = queue.Queue()
+        responses = asyncio.Queue()
+        
+        def audio_chunks():
+            while (chunk := requests.get()) is not None:
+                yield chunk
+        
+        def recognize():
+            try:
+                for response in self.asr_service.streaming_response_generator(
+                    audio_chunks=audio_chunks(),
+                    streaming_config=self.config,
+                ):
+                    loop.call_soon_threadsafe(responses.put_nowait, response)
+            except Exception as e:
+                loop.call_soon_threadsafe(responses.put_nowait, e)
+            else:
+                loop.call_soon_threadsafe(responses.put_nowait, None)
+        
+        async def feed():
+            try:
+                async for chunk in pcm_stream:
+                    requests.put(chunk)
+            finally:
+                requests.put(None)
+        
+        feeder = asyncio.create_task(feed())
+        threading.Thread(target=recognize, name="riva-asr-stream", daemon=True).start()
+        
+        try:
+            while (response := await responses.get()) is not None:
+                if isinstance(response, Exception):
+                    raise response
+                yield response
+        finally:
+            feeder.cancel()
+            requests.put(None)
+    
+    async def direct_responses(self, pcm_stream: AsyncGenerator[bytes, None]) -> AsyncGenerator:
+        """RIVA streaming call through the fallback grpc.aio stub"""
+        async def requests():
+            yield self.request_type(streaming_config=self.config)
+            async for chunk in pcm_stream:
+                yield self.request_type(audio_content=chunk)
+        
+        call = self.stub.StreamingRecognize(requests())
+        try:
+            async for response in call:
+                yield response
+        finally:
+            call.cancel()
     
     async def streaming_recognize(self, audio_stream: AsyncGenerator[bytes, None]) -> AsyncGenerator[dict, None]:
         """
         Perform streaming speech recognition
         """
+        # One resampler per stream carries filter state across chunks
+        resampler = Resampler(8000, 16000)
+        pcm_stream = (resampler.process(audio_chunk) async for audio_chunk in audio_stream)
+        
+        if getattr(self, 'use_direct_grpc', False):
+            responses = self.direct_responses(pcm_stream)
+        else:
+            responses = self.threaded_responses(pcm_stream)
+        
         try:
-            # Collect audio chunks for simplified processing
-            audio_buffer = []
-            async for audio_chunk in audio_stream:
-                resampled_audio = self.resample_audio(audio_chunk)
-                audio_buffer.append(resampled_audio)
-                
-                # Process when we have enough audio (e.g., 1 second)
-                if len(audio_buffer) >= 50:  # Approximately 1 second at 20ms chunks
-                    combined_audio = b''.join(audio_buffer)
-                    
-                    # For now, yield a placeholder result
-                    # In production, this would use actual RIVA streaming
-                    yield {
-                        'transcript': "[Processing audio...]",
-                        'is_final': False,
-                        'confidence': 0.0
-                    }
-                    
-                    audio_buffer = []
-                    
+            async with aclosing(responses):
+                async for response in responses:
+                    for result in response.results:
+                        if not result.alternatives:
+                            continue
+                        alternative = result.alternatives[0]
+                        yield {
+                            'transcript': alternative.transcript,
+                            'is_final': result.is_final,
+                            'confidence': alternative.confidence
+                        }
         except Exception as e:
             logger.error(f"Error in streaming recognition: {e}")
     
@@ -110,10 +188,10 @@ class RivaASRClient:
             logger.error(f"Error in recognition: {e}")
             return None
     
-    def close(self):
+    async def close(self):
         """Close the connection"""
         if hasattr(self, 'channel'):
-            self.channel.close()
+            await self.channel.close()
         logger.info("RIVA ASR client closed")
 
 class AudioProcessor:
@@ -127,16 +205,26 @@ class AudioProcessor:
         await self.audio_queue.put(audio_chunk)
     
     async def audio_generator(self):
-        """Generate audio chunks for ASR"""
-        while self.is_processing:
+        """Generate audio chunks for ASR until stop_processing queues None"""
+        queue = self.audio_queue
+        while (audio_chunk := await queue.get()) is not None:
+            # Send whatever has queued up behind it in the same request, up to
+            # BATCH_CHUNKS; a caught-up stream still goes out chunk by chunk
+            batch = [audio_chunk]
+            stopped = False
             try:
-                audio_chunk = await asyncio.wait_for(self.audio_queue.get(), timeout=0.1)
-                yield audio_chunk
-            except asyncio.TimeoutError:
-                continue
-            except Exception as e:
-                logger.error(f"Error in audio generator: {e}")
-                break
+                while len(batch) < BATCH_CHUNKS:
+                    chunk = queue.get_nowait()
+                    if chunk is None:
+                        stopped = True
+                        break
+                    batch.append(chunk)
+            except asyncio.QueueEmpty:
+                pass
+            
+            yield b''.join(batch)
+            if stopped:
+                return
     
     async def start_processing(self, transcript_callback):
         """Start processing audio stream"""
@@ -153,13 +241,15 @@ class AudioProcessor:
     def stop_processing(self):
         """Stop processing audio"""
         self.is_processing = False
+        # Ends audio_generator once the audio queued ahead of it is sent
+        self.audio_queue.put_nowait(None)
 
 if __name__ == "__main__":
     async def test():
         try:
             client = RivaASRClient()
             logger.info("RIVA ASR client test completed")
-            client.close()
+            await client.close()
         except Exception as e:
             logger.error(f"Test failed: {e}")
     
@@ -3,20 +3,26 @@
 RIVA TTS Client for text-to-speech synthesis
 """
 import asyncio
-import grpc
+import grpc.aio
 import logging
 import os
 from typing import AsyncGenerator, Optional
 import riva.client
 from dotenv import load_dotenv
-import audioop
 import numpy as np
+import mulaw
+from resample import Resampler
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 20 ms of 8 kHz silence as 16-bit PCM and as μ-law (silence encodes to 0xFF);
+# both are constant, so they're built once and never re-encoded
+SILENCE_PCM_CHUNK = bytes(320)
+SILENCE_ULAW_CHUNK = mulaw.encode(SILENCE_PCM_CHUNK)
+
 class RivaTTSClient:
     def __init__(self):
         self.server = f"{os.getenv('RIVA_SERVER_HOST', 'localhost')}:{os.getenv('RIVA_SERVER_PORT', '50051')}"
@@ -37,15 +43,15 @@ class RivaTTSClient:
         """Fallback to direct gRPC API"""
         from riva.client.proto import riva_tts_pb2, riva_tts_pb2_grpc
         
-        self.channel = grpc.insecure_channel(self.server)
+        # grpc.aio so fallback calls run on the event loop instead of blocking it
+        self.channel = grpc.aio.insecure_channel(self.server)
         self.stub = riva_tts_pb2_grpc.RivaSpeechSynthesisStub(self.channel)
         self.use_direct_grpc = True
         logger.info("Using fallback gRPC API for RIVA TTS")
     
     def resample_audio(self, audio_data: bytes, from_rate: int = 16000, to_rate: int = 8000) -> bytes:
-        """Resample audio from one sample rate to another"""
-        resampled, _ = audioop.ratecv(audio_data, 2, 1, from_rate, to_rate, None)
-        return resampled
+        """Resample a standalone clip from one sample rate to another"""
+        return Resampler(from_rate, to_rate).process(audio_data)
     
     async def synthesize(self, text: str, streaming: bool = True) -> AsyncGenerator[bytes, None]:
         """
@@ -58,12 +64,13 @@ class RivaTTSClient:
             # In production, this would use actual RIVA TTS
             silence_duration = len(text) * 0.05  # Approximate speaking time
             sample_count = int(8000 * silence_duration)  # 8kHz sample rate
-            silence = b'\x00' * (sample_count * 2)  # 16-bit samples
             
-            # Yield in chunks
-            chunk_size = 320  # 20ms at 8kHz
-            for i in range(0, len(silence), chunk_size):
-                yield silence[i:i+chunk_size]
+            # Yield in 20 ms chunks of the shared silence buffer
+            full_chunks, remainder = divmod(sample_count * 2, len(SILENCE_PCM_CHUNK))
+            for _ in range(full_chunks):
+                yield SILENCE_PCM_CHUNK
+            if remainder:
+                yield SILENCE_PCM_CHUNK[:remainder]
                 
         except Exception as e:
             logger.error(f"Error in TTS synthesis: {e}")
@@ -73,10 +80,10 @@ class RivaTTSClient:
         self.voice_name = voice_name
         logger.info(f"TTS voice changed to: {voice_name}")
     
-    def close(self):
+    async def close(self):
         """Close the connection"""
         if hasattr(self, 'channel'):
-            self.channel.close()
+            await self.channel.close()
         logger.info("RIVA TTS client closed")
 
 class AudioOutputManager:
@@ -99,9 +106,12 @@ class AudioOutputManager:
                     logger.info("TTS playback interrupted")
                     break
                 
-                # Convert PCM to μ-law for Twilio
-                ulaw_audio = audioop.lin2ulaw(audio_chunk, 2)
-                yield ulaw_audio
+                # Convert PCM to μ-law for Twilio; a silent chunk (a quick
+                # memcmp) reuses the pre-encoded frame
+                if audio_chunk == SILENCE_PCM_CHUNK:
+                    yield SILENCE_ULAW_CHUNK
+                else:
+                    yield mulaw.encode(audio_chunk)
                 
         finally:
             self.is_playing = False
@@ -125,12 +135,14 @@ class AudioChunker:
     def add_audio(self, audio_data: bytes) -> list:
         """Add audio data and return complete chunks"""
         self.buffer.extend(audio_data)
-        chunks = []
+        size = self.chunk_size
+        end = len(self.buffer) - len(self.buffer) % size
         
-        while len(self.buffer) >= self.chunk_size:
-            chunk = bytes(self.buffer[:self.chunk_size])
-            chunks.append(chunk)
-            self.buffer = self.buffer[self.chunk_size:]
+        with memoryview(self.buffer) as view:
+            chunks = [bytes(view[i:i + size]) for i in range(0, end, size)]
+        # Deleting from the front only advances the bytearray's start offset,
+        # so the remainder isn't copied the way reslicing would copy it
+        del self.buffer[:end]
         
         return chunks
     
@@ -146,6 +158,10 @@ class AudioChunker:
             return remaining
         
         return b''
+    
+    def reset(self):
+        """Discard any buffered audio"""
+        self.buffer.clear()
 
 if __name__ == "__main__":
     async def test():
@@ -158,7 +174,7 @@ if __name__ == "__main__":
                 audio_data += chunk
             
             logger.info(f"Synthesized {len(audio_data)} bytes of audio")
-            client.close()
+            await client.close()
             
         except Exception as e:
             logger.error(f"Test failed: {e}")
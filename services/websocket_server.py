@@ -4,27 +4,89 @@ WebSocket server for handling Twilio Media Streams
 """
 import asyncio
 import websockets
-import json
-import base64
+import websockets.exceptions
+import orjson
 import logging
-import audioop
+from dataclasses import dataclass, field
 from typing import Dict, Optional
-from collections import defaultdict
 import os
 from dotenv import load_dotenv
+import mulaw
+
+try:
+    # SIMD-accelerated codec; same API as the stdlib for the calls used here
+    from pybase64 import b64decode, b64encode_as_string
+except ImportError:
+    from base64 import b64decode, b64encode
+
+    def b64encode_as_string(data: bytes) -> str:
+        return b64encode(data).decode('ascii')
+
+try:
+    import uvloop
+except ImportError:  # uvloop is Linux/macOS only; Windows keeps the default loop
+    uvloop = None
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Outbound frames buffered ahead of the writer (32 frames = 640 ms); a full
+# queue makes send_audio_to_twilio wait, so producers are held to send speed
+SEND_QUEUE_SIZE = 32
+
+# websockets.serve settings for media streams: μ-law payloads are already
+# compressed and base64 barely deflates, so permessage-deflate only costs CPU
+# and latency; Twilio's messages are well under 64 KiB
+SERVER_OPTIONS = {
+    'compression': None,
+    'max_size': 2 ** 16,
+    'ping_interval': 20,
+    'ping_timeout': 20,
+    'write_limit': 2 ** 18,
+}
+
+# Outbound messages only vary in streamSid and payload, so they're built from
+# these fragments instead of serializing a fresh dict per 20 ms frame
+MEDIA_SUFFIX = '"}}'
+
+# Payload of a silent 20 ms frame, encoded once instead of per frame
+SILENCE_PCM_FRAME = bytes(320)
+SILENCE_PAYLOAD = b64encode_as_string(mulaw.encode(SILENCE_PCM_FRAME))
+
+def media_prefix(stream_sid: str) -> str:
+    """Everything in a media message up to its base64 payload"""
+    return f'{{"event":"media","streamSid":{orjson.dumps(stream_sid).decode()},"media":{{"payload":"'
+
+def clear_message(stream_sid: str) -> str:
+    """Clear message stopping playback on the stream"""
+    return f'{{"event":"clear","streamSid":{orjson.dumps(stream_sid).decode()}}}'
+
+@dataclass(slots=True)
+class ConnectionState:
+    """Per-connection call metadata and audio buffers"""
+    stream_sid: Optional[str] = None
+    call_sid: Optional[str] = None
+    caller_number: Optional[str] = None
+    # Set by the stream start event
+    start_time: Optional[float] = None
+    # Message fragments for stream_sid, built once at start
+    media_prefix: str = ""
+    clear_message: str = ""
+    # Inbound μ-law audio not yet processed
+    audio_buffer: bytearray = field(default_factory=bytearray)
+    # Outbound (generation, message) pairs, sent by writer_task once the
+    # stream has started; a clear bumps generation so older frames are dropped
+    send_queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=SEND_QUEUE_SIZE))
+    writer_task: Optional[asyncio.Task] = None
+    generation: int = 0
+    # Set when the socket closed under the writer; later frames are discarded
+    closed: bool = False
+
 class TwilioMediaStreamHandler:
     def __init__(self):
-        self.connections: Dict[str, dict] = {}
-        self.audio_buffers = defaultdict(bytearray)
-        self.stream_sids = {}
-        self.call_sids = {}
-        self.caller_numbers = {}
+        self.states: Dict[int, ConnectionState] = {}
         
     async def handle_connection(self, websocket, path):
         """Handle new WebSocket connection from Twilio"""
@@ -42,11 +104,11 @@ class TwilioMediaStreamHandler:
     async def process_message(self, websocket, message: str, connection_id: int):
         """Process incoming message from Twilio"""
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             event = data.get('event')
             
             if event == 'start':
-                await self.handle_start(data, connection_id)
+                await self.handle_start(data, connection_id, websocket)
             elif event == 'media':
                 await self.handle_media(data, connection_id, websocket)
             elif event == 'stop':
@@ -54,12 +116,12 @@ class TwilioMediaStreamHandler:
             elif event == 'mark':
                 await self.handle_mark(data, connection_id)
                 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Invalid JSON received: {message[:100]}")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
     
-    async def handle_start(self, data: dict, connection_id: int):
+    async def handle_start(self, data: dict, connection_id: int, websocket):
         """Handle stream start event"""
         start_data = data.get('start', {})
         stream_sid = start_data.get('streamSid')
@@ -69,16 +131,18 @@ class TwilioMediaStreamHandler:
         # Extract caller information
         caller_number = custom_params.get('from', 'Unknown')
         
-        self.stream_sids[connection_id] = stream_sid
-        self.call_sids[connection_id] = call_sid
-        self.caller_numbers[connection_id] = caller_number
+        state = self.states.get(connection_id)
+        if state is None:
+            state = self.states[connection_id] = ConnectionState()
+        state.stream_sid = stream_sid
+        state.call_sid = call_sid
+        state.caller_number = caller_number
+        state.start_time = asyncio.get_running_loop().time()
+        state.media_prefix = media_prefix(stream_sid)
+        state.clear_message = clear_message(stream_sid)
         
-        self.connections[connection_id] = {
-            'stream_sid': stream_sid,
-            'call_sid': call_sid,
-            'caller_number': caller_number,
-            'start_time': asyncio.get_event_loop().time()
-        }
+        if state.writer_task is None:
+            state.writer_task = asyncio.create_task(self.write_frames(websocket, state))
         
         logger.info(f"Stream started - SID: {stream_sid}, Call: {call_sid}, From: {caller_number}")
     
@@ -89,27 +153,35 @@ class TwilioMediaStreamHandler:
         
         if payload:
             # Decode the base64 μ-law audio
-            audio_bytes = base64.b64decode(payload)
+            audio_bytes = b64decode(payload)
+            
+            state = self.states.get(connection_id)
+            if state is None:
+                # Media ahead of the start event is buffered until it arrives
+                state = self.states[connection_id] = ConnectionState()
             
             # Buffer the audio
-            self.audio_buffers[connection_id].extend(audio_bytes)
+            buffer = state.audio_buffer
+            buffer.extend(audio_bytes)
             
             # Process buffered audio when we have enough (e.g., 160 bytes = 20ms at 8kHz)
-            if len(self.audio_buffers[connection_id]) >= 160:
-                await self.process_audio_chunk(connection_id, websocket)
+            if len(buffer) >= 160:
+                await self.process_audio_chunk(state, websocket)
     
-    async def process_audio_chunk(self, connection_id: int, websocket):
+    async def process_audio_chunk(self, state: ConnectionState, websocket):
         """Process a chunk of audio data"""
-        audio_chunk = bytes(self.audio_buffers[connection_id][:160])
-        self.audio_buffers[connection_id] = self.audio_buffers[connection_id][160:]
+        buffer = state.audio_buffer
+        audio_chunk = bytes(buffer[:160])
+        # Consume in place; bytearray drops a prefix by moving its start offset
+        del buffer[:160]
         
         # Convert μ-law to PCM for processing
-        pcm_audio = audioop.ulaw2lin(audio_chunk, 2)
+        pcm_audio = mulaw.decode(audio_chunk).tobytes()
         
         # Here we'll integrate with RIVA ASR
         # For now, just log
-        if connection_id in self.connections:
-            caller = self.caller_numbers.get(connection_id, "Unknown")
+        if state.start_time is not None:
+            caller = state.caller_number
             # This is where we'll send audio to ASR service
             
     async def handle_stop(self, data: dict, connection_id: int):
@@ -125,55 +197,95 @@ class TwilioMediaStreamHandler:
     
     async def send_audio_to_twilio(self, websocket, audio_data: bytes, stream_sid: str):
         """Send audio back to Twilio"""
-        # Convert PCM to μ-law
-        ulaw_audio = audioop.lin2ulaw(audio_data, 2)
-        
-        # Base64 encode
-        encoded_audio = base64.b64encode(ulaw_audio).decode('utf-8')
+        if audio_data == SILENCE_PCM_FRAME:
+            encoded_audio = SILENCE_PAYLOAD
+        else:
+            # Convert PCM to μ-law
+            ulaw_audio = mulaw.encode(audio_data)
+            
+            # Base64 encode
+            encoded_audio = b64encode_as_string(ulaw_audio)
         
         # Create media message
-        message = {
-            "event": "media",
-            "streamSid": stream_sid,
-            "media": {
-                "payload": encoded_audio
-            }
-        }
+        state = self.states.get(id(websocket))
+        if state is not None and state.stream_sid == stream_sid:
+            prefix = state.media_prefix
+        else:
+            prefix = media_prefix(stream_sid)
+        frame = f"{prefix}{encoded_audio}{MEDIA_SUFFIX}"
         
-        await websocket.send(json.dumps(message))
+        if state is not None and state.writer_task is not None:
+            if not state.closed:
+                await state.send_queue.put((state.generation, frame))
+        else:
+            await websocket.send(frame)
+    
+    async def write_frames(self, websocket, state: ConnectionState):
+        """Send queued messages to Twilio in order, skipping ones a clear made stale"""
+        queue = state.send_queue
+        while True:
+            generation, message = await queue.get()
+            if generation != state.generation:
+                continue
+            
+            try:
+                await websocket.send(message)
+            except websockets.exceptions.ConnectionClosed:
+                state.closed = True
+                while not queue.empty():
+                    queue.get_nowait()
+                break
+            except Exception as e:
+                logger.error(f"Error sending audio to Twilio: {e}")
     
     async def send_clear_to_twilio(self, websocket, stream_sid: str):
         """Send clear message to stop audio playback"""
-        message = {
-            "event": "clear",
-            "streamSid": stream_sid
-        }
-        await websocket.send(json.dumps(message))
+        state = self.states.get(id(websocket))
+        if state is not None and state.stream_sid == stream_sid:
+            message = state.clear_message
+        else:
+            message = clear_message(stream_sid)
+        
+        if state is None or state.writer_task is None:
+            await websocket.send(message)
+            return
+        if state.closed:
+            return
+        
+        # Goes through the writer so nothing queued before it, including a
+        # frame the writer has already dequeued, can play after the clear;
+        # the queue was just emptied, so there is room for it
+        state.generation += 1
+        queue = state.send_queue
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait((state.generation, message))
     
     async def cleanup_connection(self, connection_id: int):
         """Clean up connection resources"""
-        if connection_id in self.connections:
-            del self.connections[connection_id]
-        if connection_id in self.audio_buffers:
-            del self.audio_buffers[connection_id]
-        if connection_id in self.stream_sids:
-            del self.stream_sids[connection_id]
-        if connection_id in self.call_sids:
-            del self.call_sids[connection_id]
-        if connection_id in self.caller_numbers:
-            del self.caller_numbers[connection_id]
+        state = self.states.pop(connection_id, None)
+        if state is not None and state.writer_task is not None:
+            state.writer_task.cancel()
+            # Free queue space so no sender stays blocked on a full queue
+            state.closed = True
+            queue = state.send_queue
+            while not queue.empty():
+                queue.get_nowait()
 
 async def start_server():
     """Start the WebSocket server"""
     handler = TwilioMediaStreamHandler()
     host = os.getenv('WEBSOCKET_HOST', '0.0.0.0')
     port = int(os.getenv('WEBSOCKET_PORT', 8080))
+    reuse_port = os.getenv('WEBSOCKET_REUSE_PORT') == '1'
     
     logger.info(f"Starting WebSocket server on {host}:{port}")
     
-    async with websockets.serve(handler.handle_connection, host, port):
+    async with websockets.serve(handler.handle_connection, host, port, reuse_port=reuse_port, **SERVER_OPTIONS):
         logger.info("WebSocket server is running...")
         await asyncio.Future()  # Run forever
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(start_server())
@@ -13,28 +13,44 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-def start_ngrok_tunnel(port, name):
-    """Start an ngrok tunnel for a specific port"""
-    print(f"Starting ngrok for {name} on port {port}...")
+# Tunnel definitions for both services, and the agent's own config (which
+# holds the authtoken when it was saved with `ngrok config add-authtoken`)
+NGROK_CONFIG = '/home/ubuntu/twilio_riva_agent/config/ngrok.yml'
+NGROK_AGENT_CONFIG = os.path.expanduser('~/.config/ngrok/ngrok.yml')
+
+def start_ngrok_tunnels():
+    """Start one ngrok agent serving every tunnel in NGROK_CONFIG"""
+    print("Starting ngrok for WebSocket and TwiML...")
+    command = ['ngrok', 'start', '--all', '--log', 'stdout']
+    if os.path.exists(NGROK_AGENT_CONFIG):
+        command += ['--config', NGROK_AGENT_CONFIG]
+    command += ['--config', NGROK_CONFIG]
     process = subprocess.Popen(
-        ['ngrok', 'http', str(port), '--log', 'stdout'],
+        command,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE
     )
     return process
 
-def get_ngrok_url(port, retries=10):
-    """Get the public URL from ngrok API"""
-    for i in range(retries):
-        try:
-            response = requests.get('http://localhost:4040/api/tunnels')
-            tunnels = response.json()['tunnels']
-            for tunnel in tunnels:
-                if str(port) in tunnel['config']['addr']:
-                    return tunnel['public_url']
-        except:
+def get_ngrok_urls(ports, retries=10):
+    """Get the public URL for each port from one ngrok API listing"""
+    # One keep-alive connection for all the polling
+    with requests.Session() as session:
+        for i in range(retries):
+            try:
+                response = session.get('http://localhost:4040/api/tunnels', timeout=2)
+                tunnels = response.json()['tunnels']
+                urls = {}
+                for tunnel in tunnels:
+                    for port in ports:
+                        if str(port) in tunnel['config']['addr']:
+                            urls[port] = tunnel['public_url']
+                if len(urls) == len(ports):
+                    return urls
+            except Exception:
+                pass
             time.sleep(1)
-    return None
+    return {}
 
 def update_env_file(websocket_url, twiml_url):
     """Update the .env file with public URLs"""
@@ -67,15 +83,13 @@ def main():
     time.sleep(2)
     
     # Start ngrok tunnels
-    ngrok_ws = start_ngrok_tunnel(8080, "WebSocket")
-    time.sleep(2)
-    ngrok_twiml = start_ngrok_tunnel(5000, "TwiML")
-    time.sleep(3)
+    ngrok = start_ngrok_tunnels()
     
-    # Get public URLs
+    # Get public URLs; polling takes over from a fixed startup wait
     print("\nGetting ngrok public URLs...")
-    ws_url = get_ngrok_url(8080)
-    twiml_url = get_ngrok_url(5000)
+    urls = get_ngrok_urls([8080, 5000])
+    ws_url = urls.get(8080)
+    twiml_url = urls.get(5000)
     
     if not ws_url or not twiml_url:
         print("ERROR: Failed to get ngrok URLs")
@@ -93,13 +107,25 @@ def main():
     os.environ['WEBSOCKET_URL'] = ws_url_wss
     os.environ['TWIML_URL'] = twiml_url
     
-    # Start the main voice agent
-    print("\nStarting Voice Agent...")
-    voice_agent = subprocess.Popen(
-        ['python3', '/home/ubuntu/twilio_riva_agent/main.py'],
-        stdout=open('/home/ubuntu/twilio_riva_agent/logs/voice_agent.log', 'w'),
-        stderr=subprocess.STDOUT
-    )
+    # Start the voice agent. One process by default; VOICE_AGENT_WORKERS > 1
+    # opts in to several, each with its own RIVA/OpenAI clients, sharing the
+    # port via SO_REUSEPORT so the kernel balances calls between them
+    workers = max(1, int(os.getenv('VOICE_AGENT_WORKERS', 1)))
+    print(f"\nStarting Voice Agent ({workers} worker{'s' if workers > 1 else ''})...")
+    voice_agents = []
+    for i in range(workers):
+        if workers == 1:
+            env = os.environ
+            log_path = '/home/ubuntu/twilio_riva_agent/logs/voice_agent.log'
+        else:
+            env = {**os.environ, 'WEBSOCKET_REUSE_PORT': '1'}
+            log_path = f'/home/ubuntu/twilio_riva_agent/logs/voice_agent_{i}.log'
+        voice_agents.append(subprocess.Popen(
+            ['python3', '/home/ubuntu/twilio_riva_agent/main.py'],
+            stdout=open(log_path, 'w'),
+            stderr=subprocess.STDOUT,
+            env=env
+        ))
     
     # Start the TwiML server
     print("Starting TwiML server...")
@@ -122,12 +148,14 @@ def main():
     print(f"   WebSocket: {ws_url_wss}")
     print(f"   TwiML: {twiml_url}/voice")
     print("\n📝 Process PIDs:")
-    print(f"   Voice Agent: {voice_agent.pid}")
+    print(f"   Voice Agent: {', '.join(str(p.pid) for p in voice_agents)}")
     print(f"   TwiML Server: {twiml_server.pid}")
-    print(f"   Ngrok WS: {ngrok_ws.pid}")
-    print(f"   Ngrok TwiML: {ngrok_twiml.pid}")
+    print(f"   Ngrok: {ngrok.pid}")
     print("\n📂 Logs:")
-    print("   Voice Agent: /home/ubuntu/twilio_riva_agent/logs/voice_agent.log")
+    if workers == 1:
+        print("   Voice Agent: /home/ubuntu/twilio_riva_agent/logs/voice_agent.log")
+    else:
+        print(f"   Voice Agent: /home/ubuntu/twilio_riva_agent/logs/voice_agent_{{0..{workers - 1}}}.log")
     print("   TwiML Server: /home/ubuntu/twilio_riva_agent/logs/twiml_server.log")
     print("\nPress Ctrl+C to stop all services")
     print("=" * 50)
@@ -135,10 +163,10 @@ def main():
     # Handle shutdown
     def signal_handler(sig, frame):
         print("\n\nStopping all services...")
-        voice_agent.terminate()
+        for voice_agent in voice_agents:
+            voice_agent.terminate()
         twiml_server.terminate()
-        ngrok_ws.terminate()
-        ngrok_twiml.terminate()
+        ngrok.terminate()
         subprocess.run(['pkill', '-f', 'ngrok'], capture_output=True)
         print("All services stopped.")
         sys.exit(0)
@@ -147,7 +175,8 @@ def main():
     
     # Wait forever
     try:
-        voice_agent.wait()
+        for voice_agent in voice_agents:
+            voice_agent.wait()
     except KeyboardInterrupt:
         signal_handler(None, None)
 
@@ -3,11 +3,16 @@
 TwiML server to handle incoming Twilio calls
 """
 from aiohttp import web
-from twilio.twiml.voice_response import VoiceResponse, Stream
 import logging
 import os
+from xml.sax.saxutils import escape
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:  # uvloop is Linux/macOS only; Windows keeps the default loop
+    uvloop = None
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
@@ -16,6 +21,23 @@ logger = logging.getLogger(__name__)
 # WebSocket URL - will be replaced with ngrok URL
 WEBSOCKET_URL = os.getenv('WEBSOCKET_URL', 'wss://your-ngrok-url.ngrok.io')
 
+# Escaping for values placed in double-quoted XML attributes
+XML_ATTRIBUTE_ENTITIES = {'"': '&quot;'}
+
+# The TwiML twilio's VoiceResponse builds for every call, pre-rendered; only
+# the caller and call SID vary, so the /voice hot path is one str.format
+TWIML_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Response>'
+    '<Say voice="alice">Connecting you to the AI assistant...</Say>'
+    '<Stream url="' + escape(WEBSOCKET_URL, XML_ATTRIBUTE_ENTITIES).replace('{', '{{').replace('}', '}}') + '">'
+    '<Parameter name="from" value="{caller}" />'
+    '<Parameter name="callSid" value="{call_sid}" />'
+    '</Stream>'
+    '<Pause length="3600" />'  # 1 hour max call duration
+    '</Response>'
+)
+
 async def handle_incoming_call(request):
     """Handle incoming call and return TwiML response"""
     
@@ -27,24 +49,14 @@ async def handle_incoming_call(request):
     
     logger.info(f"Incoming call from {caller} to {called} (SID: {call_sid})")
     
-    # Create TwiML response
-    response = VoiceResponse()
-    
-    # Add initial greeting
-    response.say("Connecting you to the AI assistant...", voice='alice')
-    
-    # Start Media Stream to WebSocket
-    stream = Stream(url=WEBSOCKET_URL)
-    stream.parameter(name='from', value=caller)
-    stream.parameter(name='callSid', value=call_sid)
-    
-    response.append(stream)
-    
-    # Keep the call alive
-    response.pause(length=3600)  # 1 hour max call duration
+    # Greet, start the Media Stream to the WebSocket and keep the call alive
+    twiml = TWIML_TEMPLATE.format(
+        caller=escape(caller, XML_ATTRIBUTE_ENTITIES),
+        call_sid=escape(call_sid, XML_ATTRIBUTE_ENTITIES),
+    )
     
     return web.Response(
-        text=str(response),
+        text=twiml,
         content_type='application/xml'
     )
 
@@ -68,6 +80,8 @@ def main():
     port = int(os.getenv('TWIML_PORT', 5000))
     
     logger.info(f"Starting TwiML server on port {port}")
+    if uvloop is not None:
+        uvloop.install()
     web.run_app(app, host='0.0.0.0', port=port)
 
 if __name__ == '__main__':